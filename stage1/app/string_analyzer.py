@@ -1,49 +1,245 @@
-from flask import Blueprint, request, jsonify
+import json
+import os
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from datetime import datetime, timezone
 import hashlib
 
-from utils.compute_properties import compute_properties
-from utils.parse_natural_language import parse_natural_language
+from utils.compute_properties import (
+    CHUNK_SIZE,
+    compute_properties,
+    compute_properties_many,
+    compute_properties_stream,
+)
+from utils.parse_natural_language import parse_natural_language, plan_cache_info
+from utils.response_cache import ResponseCache
+from utils.sqlite_backend import backend_from_env
+from utils.stored_string import StoredString
+from utils.string_store import StringStore
 
 string_bp = Blueprint("strings", __name__)
 
-# In-memory storage: {sha256_hash: record}
-STRING_STORE = {}
+# Storage: {sha256_hash: record}, indexed for the list filters. Kept in
+# memory, or persisted to the SQLite log at $STRING_STORE_PATH if set.
+STRING_STORE = StringStore(backend=backend_from_env(os.environ))
+
+# Serialized list responses, invalidated whenever the store changes.
+RESULT_CACHE = ResponseCache(max_bytes=int(os.environ.get("STRING_RESULT_CACHE_BYTES", 64 << 20)))
+
+# Number of items computed and inserted together by POST /strings/batch.
+BATCH_SIZE = 1000
+
+
+def parse_page_args():
+    """Read the pagination query params shared by the list endpoints.
+
+    ``limit`` caps the page size, ``cursor`` is the ``next_cursor`` of the
+    previous page and ``stream=true`` switches to a chunked response.
+
+    Returns:
+        tuple: (page dict, None) or (None, 400 error response).
+    """
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    try:
+        limit = int(limit) if limit is not None else None
+        after = int(cursor) if cursor else None
+    except ValueError:
+        return None, (jsonify({"error": "'limit' and 'cursor' must be integers"}), 400)
+
+    if limit is not None and limit < 1:
+        return None, (jsonify({"error": "'limit' must be a positive integer"}), 400)
+
+    return {
+        "limit": limit,
+        "after": after,
+        "stream": request.args.get("stream", "").lower() == "true",
+    }, None
+
+
+def page_response(cache_key, matches, page, extra):
+    """Build a list response from lazily produced (seq, record) matches.
+
+    Only one page of records is ever held: either collected and
+    serialized, or, in stream mode, serialized one record at a time.
+    ``next_cursor`` is included whenever a ``limit`` was requested and is
+    null on the last page.
+
+    Serialized pages are kept in RESULT_CACHE under ``cache_key`` (which
+    must identify the filters and page) until the store changes, and are
+    served with an ETag: a matching If-None-Match gets a 304, and neither
+    that nor any other cache hit runs the query.
+    """
+    if page["stream"]:
+        return Response(
+            stream_with_context(_stream_page(matches, page["limit"], extra)),
+            mimetype="application/json",
+        )
+
+    key = (cache_key, page["limit"], page["after"])
+    generation = STRING_STORE.generation
+    entry = RESULT_CACHE.get(key, generation)
+    if entry is None:
+        data, next_cursor = _collect_page(matches, page["limit"])
+        body = {"data": data, "count": len(data), **extra}
+        if page["limit"] is not None:
+            body["next_cursor"] = next_cursor
+        entry = RESULT_CACHE.put(key, generation, (current_app.json.dumps(body) + "\n").encode())
+
+    if request.if_none_match.contains(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, status=200, mimetype="application/json")
+    response.set_etag(entry.etag)
+    return response
+
+
+def _collect_page(matches, limit):
+    data, last_seq = [], None
+    for seq, record in matches:
+        if limit is not None and len(data) == limit:
+            return data, str(last_seq)
+        data.append(record.to_dict())
+        last_seq = seq
+    return data, None
+
+
+def _stream_page(matches, limit, extra):
+    dumps = current_app.json.dumps
+    count, last_seq, next_cursor = 0, None, None
+
+    yield '{"data": ['
+    for seq, record in matches:
+        if limit is not None and count == limit:
+            next_cursor = str(last_seq)
+            break
+        yield ("," if count else "") + dumps(record.to_dict())
+        count += 1
+        last_seq = seq
+
+    tail = {"count": count, **extra}
+    if limit is not None:
+        tail["next_cursor"] = next_cursor
+    # Splice the trailing fields into the object opened above.
+    yield "], " + dumps(tail)[1:]
 
 
 @string_bp.route("/strings", methods=["POST"])
 def create_string():
     """This a post-request.
 
-    Analyze and store a string
+    Analyze and store a string. The string is either the 'value' field
+    of a JSON body or, for text/plain, the raw body itself, which is
+    analyzed while it is read.
     """
-    if not request.is_json:
+    if request.mimetype == "text/plain":
+        chunks = iter(lambda: request.stream.read(CHUNK_SIZE), b"")
+        try:
+            value, props = compute_properties_stream(chunks)
+        except UnicodeDecodeError:
+            return jsonify({"error": "Body must be UTF-8 text"}), 422
+
+    elif not request.is_json:
         return jsonify({"error": "Invalid content type"}), 400
 
-    body = request.get_json()
-    if not body or "value" not in body:
-        return jsonify({"error": "Missing 'value' field"}), 400
+    else:
+        body = request.get_json()
+        if not body or "value" not in body:
+            return jsonify({"error": "Missing 'value' field"}), 400
+
+        value = body["value"]
+        if not isinstance(value, str):
+            return jsonify({"error": "'value' must be a string"}), 422
 
-    value = body["value"]
-    if not isinstance(value, str):
-        return jsonify({"error": "'value' must be a string"}), 422
+        props = compute_properties(value)
 
-    props = compute_properties(value)
-    string_id = props["sha256_hash"]
+    record = StoredString.create(value, props)
 
-    if string_id in STRING_STORE:
+    if not STRING_STORE.add(record):
         return jsonify({"error": "String already exists"}), 409
 
-    record = {
-        "id": string_id,
-        "value": value,
-        "properties": props,
-        "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-    }
+    return jsonify(record.to_dict()), 201
+
+
+@string_bp.route("/strings/batch", methods=["POST"])
+def create_strings_batch():
+    """A POST request.
+
+    Analyze and store many strings at once. The body is either a JSON
+    array or an NDJSON stream (application/x-ndjson) of {"value": ...}
+    objects. Items are processed BATCH_SIZE at a time: properties are
+    computed across a process pool and each group is inserted under a
+    single store lock.
+
+    Exception:
+        BadRequest (400): Invalid content type or body.
+
+    Returns:
+        jsonify response (200): Per-item 201/409/422 results and totals.
+    """
+    if request.mimetype == "application/x-ndjson":
+        batches = _ndjson_batches(request.stream)
+    elif request.is_json:
+        body = request.get_json(silent=True)
+        if not isinstance(body, list):
+            return jsonify({"error": "Body must be a JSON array of {'value': ...} objects"}), 400
+        batches = (body[i:i + BATCH_SIZE] for i in range(0, len(body), BATCH_SIZE))
+    else:
+        return jsonify({"error": "Invalid content type"}), 400
+
+    results = []
+    for items in batches:
+        results.extend(_ingest_batch(items, len(results)))
+
+    return jsonify({
+        "results": results,
+        "created": sum(1 for r in results if r["status"] == 201),
+        "duplicates": sum(1 for r in results if r["status"] == 409),
+        "invalid": sum(1 for r in results if r["status"] == 422),
+    }), 200
 
-    STRING_STORE[string_id] = record
 
-    return jsonify(record), 201
+def _ndjson_batches(stream):
+    batch = []
+    for line in iter(stream.readline, b""):
+        if not line.strip():
+            continue
+        try:
+            batch.append(json.loads(line))
+        except ValueError:
+            batch.append(None)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _ingest_batch(items, offset):
+    results = [None] * len(items)
+    valid = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("value"), str):
+            results[i] = {"index": offset + i, "status": 422,
+                          "error": "Item must be an object with a string 'value'"}
+        else:
+            valid.append((i, item["value"]))
+
+    created_at = datetime.now(timezone.utc)
+    props_list = compute_properties_many([value for _, value in valid])
+    records = [
+        StoredString.create(value, props, created_at)
+        for (_, value), props in zip(valid, props_list)
+    ]
+
+    for (i, _), record, inserted in zip(valid, records, STRING_STORE.add_many(records)):
+        if inserted:
+            results[i] = {"index": offset + i, "status": 201, "id": record.id}
+        else:
+            results[i] = {"index": offset + i, "status": 409, "id": record.id,
+                          "error": "String already exists"}
+
+    return results
 
 
 @string_bp.route("/strings/<string_value>", methods=["GET"])
@@ -55,7 +251,7 @@ def get_string(string_value):
     Returns:
         jsonify(dist) 200: On success
     """
-    hash_val = hashlib.sha256(string_value.encode()).hexdigest()
+    hash_val = hashlib.sha256(string_value.encode()).digest()
     try:
         record = STRING_STORE.get(hash_val)
     except Exception as e:
@@ -64,7 +260,7 @@ def get_string(string_value):
     if not record:
         return jsonify({"error": "String not found"}), 404
 
-    return jsonify(record), 200
+    return jsonify(record.to_dict()), 200
 
 
 @string_bp.route("/strings", methods=["GET"])
@@ -84,34 +280,31 @@ def list_strings():
         "contains_character": request.args.get("contains_character"),
     }
 
-    results = list(STRING_STORE.values())
+    page, error = parse_page_args()
+    if error:
+        return error
 
     try:
+        is_palindrome = None
         if filters["is_palindrome"] is not None:
-            val = filters["is_palindrome"].lower() in ("true", "false")
-            results = [r for r in results if r["properties"]["is_palindrome"] == val]
-
-        if filters["min_length"] is not None:
-            results = [r for r in results if r["properties"]["length"] >= filters["min_length"]]
-
-        if filters["max_length"] is not None:
-            results = [r for r in results if r["properties"]["length"] <= filters["max_length"]]
-
-        if filters["word_count"] is not None:
-            results = [r for r in results if r["properties"]["word_count"] == filters["word_count"]]
+            is_palindrome = filters["is_palindrome"].lower() in ("true", "false")
 
-        if filters["contains_character"]:
-            char = filters["contains_character"]
-            results = [r for r in results if char in r["value"]]
+        matches = STRING_STORE.iter_query(
+            is_palindrome=is_palindrome,
+            min_length=filters["min_length"],
+            max_length=filters["max_length"],
+            word_count=filters["word_count"],
+            contains_character=filters["contains_character"],
+            after=page["after"],
+        )
 
     except Exception as e:
         return jsonify({"error": f"Invalid query parameters: {e}"}), 400
 
-    return jsonify({
-        "data": results,
-        "count": len(results),
-        "filters_applied": {k: v for k, v in filters.items() if v is not None},
-    }), 200
+    applied = {k: v for k, v in filters.items() if v is not None}
+    return page_response(("list", tuple(sorted(applied.items()))), matches, page, {
+        "filters_applied": applied,
+    })
 
 
 @string_bp.route("/strings/filter-by-natural-language", methods=["GET"])
@@ -135,25 +328,29 @@ def filter_by_natural_language():
     if not filters:
         return jsonify({"error": "Unable to parse natural language query"}), 400
 
-    # Reuse filtering logic
-    results = list(STRING_STORE.values())
-    if "is_palindrome" in filters:
-        results = [r for r in results if r["properties"]["is_palindrome"]]
-    if "word_count" in filters:
-        results = [r for r in results if r["properties"]["word_count"] == filters["word_count"]]
-    if "min_length" in filters:
-        results = [r for r in results if r["properties"]["length"] >= filters["min_length"]]
-    if "contains_character" in filters:
-        results = [r for r in results if filters["contains_character"] in r["value"]]
+    page, error = parse_page_args()
+    if error:
+        return error
 
-    return jsonify({
-        "data": results,
-        "count": len(results),
+    # Same indexed execution path as list_strings
+    matches = STRING_STORE.iter_query(**filters, after=page["after"])
+
+    return page_response(("natural-language", query), matches, page, {
         "interpreted_query": {
             "original": query,
             "parsed_filters": filters,
         }
-    }), 200
+    })
+
+
+@string_bp.route("/strings/filter-by-natural-language/cache", methods=["GET"])
+def natural_language_cache():
+    """A GET request.
+
+    Returns:
+        jsonify response (200): Natural language plan cache counters.
+    """
+    return jsonify(plan_cache_info()), 200
 
 
 @string_bp.route("/strings/<string_value>", methods=["DELETE"])
@@ -166,10 +363,9 @@ def delete_string(string_value):
     Returns:
         jsonify response (200): On successful response.
     """
-    hash_val = hashlib.sha256(string_value.encode()).hexdigest()
+    hash_val = hashlib.sha256(string_value.encode()).digest()
 
-    if hash_val not in STRING_STORE:
+    if not STRING_STORE.discard(hash_val):
         return jsonify({"error": "String not found"}), 404
-    del STRING_STORE[hash_val]
 
     return "", 204
@@ -0,0 +1,52 @@
+"""Per-item POST /strings versus POST /strings/batch.
+
+Both go through the Flask test client against a fresh in-memory store, so
+the numbers exclude network round trips (which only widen the gap).
+
+Run from the stage1 directory:
+
+    python -m benchmarks.bench_batch --count 20000
+"""
+import argparse
+import json
+import time
+
+from app import string_analyzer
+from app.app import app
+from utils.string_store import StringStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    values = [f"benchmark string number {i}" for i in range(args.count)]
+
+    string_analyzer.STRING_STORE = StringStore()
+    start = time.perf_counter()
+    for value in values:
+        client.post("/strings", json={"value": value})
+    single_s = time.perf_counter() - start
+
+    string_analyzer.STRING_STORE = StringStore()
+    start = time.perf_counter()
+    client.post("/strings/batch", json=[{"value": v} for v in values])
+    array_s = time.perf_counter() - start
+
+    string_analyzer.STRING_STORE = StringStore()
+    body = "\n".join(json.dumps({"value": v}) for v in values)
+    start = time.perf_counter()
+    client.post("/strings/batch", data=body, content_type="application/x-ndjson")
+    ndjson_s = time.perf_counter() - start
+
+    print(f"{args.count:,} strings")
+    for name, seconds in (("POST /strings x N", single_s),
+                          ("batch (JSON array)", array_s),
+                          ("batch (NDJSON)", ndjson_s)):
+        print(f"{name:<20} {seconds:8.2f}s {args.count / seconds:>12,.0f} strings/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Time and peak memory of compute_properties for 1 KB to 50 MB inputs.
+
+Compares the original multi-pass implementation with the chunked engine,
+both for an in-memory string and for the streaming variant fed with
+request-sized byte chunks.
+
+Run from the stage1 directory:
+
+    python -m benchmarks.bench_compute_properties --max-mb 50
+"""
+import argparse
+import hashlib
+import random
+import string
+import time
+import tracemalloc
+
+from utils.compute_properties import CHUNK_SIZE, compute_properties, compute_properties_stream
+
+SIZES = [1 << 10, 64 << 10, 1 << 20, 10 << 20, 50 << 20]
+
+
+def legacy_compute_properties(value: str) -> dict:
+    """The implementation before the chunked engine, kept for comparison."""
+    cleaned = value.strip()
+    hash_val = hashlib.sha256(cleaned.encode()).hexdigest()
+    freq_map = {}
+    for ch in cleaned:
+        freq_map[ch] = freq_map.get(ch, 0) + 1
+
+    return {
+        "length": len(cleaned),
+        "is_palindrome": cleaned.lower() == cleaned[::-1].lower(),
+        "unique_characters": len(set(cleaned)),
+        "word_count": len(cleaned.split()),
+        "sha256_hash": hash_val,
+        "character_frequency_map": freq_map,
+    }
+
+
+def make_text(size, seed=0):
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + "     "
+    # Repeat a random block rather than drawing every character.
+    block = "".join(rng.choices(alphabet, k=4096))
+    return (block * (size // len(block) + 1))[:size]
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def stream(data: bytes):
+    return compute_properties_stream(data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-mb", type=float, default=50)
+    args = parser.parse_args()
+
+    print(f"{'size':>8}  {'legacy':>20}  {'chunked':>20}  {'stream':>20}")
+    for size in SIZES:
+        if size > args.max_mb * (1 << 20):
+            break
+        text = make_text(size)
+        data = text.encode()
+        assert legacy_compute_properties(text) == compute_properties(text)
+
+        cells = []
+        for fn, arg in ((legacy_compute_properties, text), (compute_properties, text), (stream, data)):
+            seconds, peak = measure(fn, arg)
+            cells.append(f"{seconds * 1000:9.1f}ms {peak / (1 << 20):6.1f}MB")
+
+        label = f"{size >> 20}MB" if size >= 1 << 20 else f"{size >> 10}KB"
+        print(f"{label:>8}  " + "  ".join(f"{c:>20}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
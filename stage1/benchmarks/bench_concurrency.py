@@ -0,0 +1,135 @@
+"""Multi-threaded stress test of StringStore.
+
+Writer threads insert overlapping sets of strings (every string is
+offered by every writer), a deleter thread removes a separate set of
+pre-loaded strings and reader threads run filtered queries the whole
+time. Afterwards it checks
+that every string was inserted exactly once, that nothing was lost, and
+that the indexes agree with a plain scan of the records.
+
+Run from the stage1 directory:
+
+    python -m benchmarks.bench_concurrency --threads 8 --count 20000
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from benchmarks.bench_store import make_records
+from utils.string_store import StringStore
+
+QUERIES = [
+    {"is_palindrome": False, "min_length": 10},
+    {"word_count": 2},
+    {"contains_character": "q", "max_length": 30},
+    {"min_length": 5, "max_length": 15, "word_count": 3},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    records = make_records(args.count)
+    preloaded = records[::10]
+    records = [r for i, r in enumerate(records) if i % 10]
+    doomed = {r.id for r in preloaded}
+    store = StringStore()
+    store.add_many(preloaded)
+    inserted = Counter()
+    counts_lock = threading.Lock()
+    done = threading.Event()
+    ops = Counter()
+    errors = []
+
+    def writer(offset):
+        local = Counter()
+        # Each writer walks all records from a different offset, so every
+        # string is offered by every writer at some point.
+        for i in range(len(records)):
+            record = records[(i + offset) % len(records)]
+            if store.add(record):
+                local[record.id] += 1
+        with counts_lock:
+            inserted.update(local)
+            ops["insert"] += len(records)
+
+    def deleter():
+        remaining = set(doomed)
+        deletes = 0
+        while remaining:
+            for string_id in list(remaining):
+                deletes += 1
+                if store.discard(string_id):
+                    remaining.discard(string_id)
+        with counts_lock:
+            ops["delete"] += deletes
+
+    def reader():
+        queries = 0
+        try:
+            while not done.is_set():
+                for query in QUERIES:
+                    for _ in store.iter_query(**query):
+                        pass
+                    queries += 1
+        except Exception as e:
+            errors.append(e)
+        with counts_lock:
+            ops["query"] += queries
+
+    writers = [threading.Thread(target=writer, args=(i * len(records) // args.threads,))
+               for i in range(args.threads)]
+    readers = [threading.Thread(target=reader) for _ in range(max(1, args.threads // 2))]
+    deleters = [threading.Thread(target=deleter)]
+
+    start = time.perf_counter()
+    for t in readers + writers + deleters:
+        t.start()
+    for t in writers + deleters:
+        t.join()
+    done.set()
+    for t in readers:
+        t.join()
+    seconds = time.perf_counter() - start
+
+    duplicates = [i for i, n in inserted.items() if n > 1]
+    expected = {r.id for r in records}
+    lost = expected - set(store)
+    stale = set(store) - expected
+    mismatched = [
+        q for q in QUERIES
+        if {r.id for r in store.query(**q)} != {r.id for r in _linear(store.values(), **q)}
+    ]
+
+    print(f"{args.threads} writers, {len(readers)} readers, 1 deleter, {len(records) + len(preloaded):,} strings in {seconds:.2f}s")
+    for name in ("insert", "delete", "query"):
+        print(f"  {name:<7} {ops[name]:>10,} ops  {ops[name] / seconds:>12,.0f}/s")
+    print(f"  duplicate inserts: {len(duplicates)}  lost: {len(lost)}  not deleted: {len(stale)}  "
+          f"index mismatches: {len(mismatched)}  reader errors: {len(errors)}")
+
+    if duplicates or lost or stale or mismatched or errors:
+        raise SystemExit(1)
+
+
+def _linear(records, is_palindrome=None, min_length=None, max_length=None,
+            word_count=None, contains_character=None):
+    for r in records:
+        if is_palindrome is not None and r.is_palindrome != is_palindrome:
+            continue
+        if min_length is not None and r.length < min_length:
+            continue
+        if max_length is not None and r.length > max_length:
+            continue
+        if word_count is not None and r.word_count != word_count:
+            continue
+        if contains_character and contains_character not in r.value:
+            continue
+        yield r
+
+
+if __name__ == "__main__":
+    main()
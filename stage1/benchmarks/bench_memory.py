@@ -0,0 +1,88 @@
+"""Bytes per stored string: nested dict records versus StoredString.
+
+Measures, with tracemalloc, the memory held by the records alone (the
+``{sha256_hash: record}`` mapping) in the original nested-dict layout and
+in the compact layout, plus a full StringStore with all its indexes. The
+string values themselves are allocated up front and excluded.
+
+Run from the stage1 directory:
+
+    python -m benchmarks.bench_memory --count 50000
+"""
+import argparse
+import gc
+import random
+import string
+import tracemalloc
+from datetime import datetime, timezone
+
+from utils.compute_properties import compute_properties
+from utils.stored_string import StoredString
+from utils.string_store import StringStore
+
+
+def make_values(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 8)))
+                 for _ in range(rng.randint(1, 5))) + f" {i}"
+        for i in range(count)
+    ]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def dict_records(values, props_list):
+    store = {}
+    for value, props in zip(values, props_list):
+        props = dict(props, character_frequency_map=dict(props["character_frequency_map"]))
+        store[props["sha256_hash"]] = {
+            "id": props["sha256_hash"],
+            "value": value,
+            "properties": props,
+            "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        }
+    return store
+
+
+def compact_records(values, props_list):
+    store = {}
+    for value, props in zip(values, props_list):
+        record = StoredString.create(value, props)
+        store[record.digest] = record
+    return store
+
+
+def string_store(values, props_list):
+    store = StringStore()
+    store.add_many(StoredString.create(v, p) for v, p in zip(values, props_list))
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50000)
+    args = parser.parse_args()
+
+    values = make_values(args.count)
+    props_list = [compute_properties(v) for v in values]
+
+    print(f"{args.count:,} strings, average length {sum(map(len, values)) / len(values):.1f}")
+    for name, build in (("nested dict records", dict_records),
+                        ("StoredString records", compact_records),
+                        ("StringStore + indexes", string_store)):
+        size = measure(lambda: build(values, props_list))
+        print(f"  {name:<22} {size / (1 << 20):>9.2f}MB  {size / args.count:>8.1f} B/string")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Insert and lookup rates of the string store backends.
+
+Compares the plain dict the app used to keep, the in-memory StringStore
+and the StringStore backed by the SQLite log, plus the time a fresh
+process needs to replay the log at startup.
+
+Run from the stage1 directory:
+
+    python -m benchmarks.bench_store --count 50000
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+from utils.compute_properties import compute_properties
+from utils.sqlite_backend import SQLiteLogBackend
+from utils.stored_string import StoredString
+from utils.string_store import StringStore
+
+
+def make_records(count, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        words = ("".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 8)))
+                 for _ in range(rng.randint(1, 5)))
+        value = f"{' '.join(words)} {i}"
+        records.append(StoredString.create(value, compute_properties(value)))
+    return records
+
+
+def rate(count, seconds):
+    return f"{count / seconds:>12,.0f}/s" if seconds else "         inf/s"
+
+
+def bench(name, records, insert, lookup):
+    start = time.perf_counter()
+    for record in records:
+        insert(record)
+    insert_s = time.perf_counter() - start
+
+    ids = [r.id for r in records]
+    start = time.perf_counter()
+    for string_id in ids:
+        lookup(string_id)
+    lookup_s = time.perf_counter() - start
+
+    print(f"{name:<22} insert {rate(len(records), insert_s)}   lookup {rate(len(ids), lookup_s)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    records = make_records(args.count)
+    print(f"{args.count:,} records")
+
+    plain = {}
+    bench("dict", records, lambda r: plain.__setitem__(r.id, r), plain.get)
+
+    memory = StringStore()
+    bench("StringStore (memory)", records, memory.add, memory.get)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "strings.db")
+        persistent = StringStore(backend=SQLiteLogBackend(path))
+        bench("StringStore (sqlite)", records, persistent.add, persistent.get)
+
+        start = time.perf_counter()
+        replayed = StringStore(backend=SQLiteLogBackend(path))
+        replay_s = time.perf_counter() - start
+        print(f"{'replay on startup':<22} {len(replayed):,} records in {replay_s:.3f}s "
+              f"({rate(len(replayed), replay_s).strip()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Substring search with the trigram index versus a linear scan.
+
+Also prints the memory footprint of every index, per index and per
+stored string, since the trigram index dominates it.
+
+Run from the stage1 directory:
+
+    python -m benchmarks.bench_substring --count 50000
+"""
+import argparse
+import time
+
+from benchmarks.bench_store import make_records
+from utils.string_store import StringStore
+
+NEEDLES = ["abc", "qzx", "hello", "ab", "e", "xyz 1"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    records = make_records(args.count)
+    store = StringStore()
+    store.add_many(records)
+    values = [(r.id, r.value) for r in records]
+
+    print(f"{args.count:,} strings")
+    print(f"{'needle':<10} {'matches':>8} {'indexed':>12} {'linear':>12}")
+    for needle in NEEDLES:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            found = store.query(contains_character=needle)
+        indexed_s = (time.perf_counter() - start) / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = [i for i, value in values if needle in value]
+        linear_s = (time.perf_counter() - start) / args.repeat
+
+        assert [r.id for r in found] == expected
+        print(f"{needle!r:<10} {len(found):>8,} {indexed_s * 1000:>10.2f}ms {linear_s * 1000:>10.2f}ms")
+
+    stats = store.index_stats()
+    print()
+    print("index memory")
+    for name in ("length", "word_count", "palindrome", "char", "trigram"):
+        size = stats[f"{name}_bytes"]
+        print(f"  {name:<11} {size / (1 << 20):>9.2f}MB  {size / args.count:>8.1f} B/string")
+    print(f"  trigram keys {stats['trigram_keys']:,}, postings {stats['trigram_postings']:,}, "
+          f"unindexed long values {stats['unindexed_long_values']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app imports ``utils`` as a top-level package, as it does when run
+# from this directory with ``python -m app.app`` or gunicorn.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+import pytest
+
+from utils import compute_properties as cp
+from utils.compute_properties import compute_properties, compute_properties_stream
+
+VALUES = [
+    "",
+    "   ",
+    "racecar",
+    "  Race Car \n",
+    "A man a plan a canal Panama",
+    "hello   world\tfrom\nstage one",
+    "  ΣΑς saς  ",
+    "été　été",
+]
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Force several chunks even for short strings.
+    monkeypatch.setattr(cp, "CHUNK_SIZE", 3)
+
+
+def reference(value):
+    cleaned = value.strip()
+    freq_map = {}
+    for ch in cleaned:
+        freq_map[ch] = freq_map.get(ch, 0) + 1
+    return {
+        "length": len(cleaned),
+        "is_palindrome": cleaned.lower() == cleaned[::-1].lower(),
+        "unique_characters": len(set(cleaned)),
+        "word_count": len(cleaned.split()),
+        "character_frequency_map": freq_map,
+    }
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_matches_reference(value):
+    props = compute_properties(value)
+    assert props["sha256_hash"] == cp.hashlib.sha256(value.strip().encode()).hexdigest()
+    del props["sha256_hash"]
+    assert props == reference(value)
+
+
+@pytest.mark.parametrize("value", VALUES)
+@pytest.mark.parametrize("size", [1, 2, 5])
+def test_stream_matches_compute_properties(value, size):
+    data = value.encode()
+    streamed_value, props = compute_properties_stream(data[i:i + size] for i in range(0, len(data), size))
+    assert streamed_value == value
+    assert props == compute_properties(value)
@@ -0,0 +1,32 @@
+from utils.response_cache import ResponseCache
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ResponseCache(max_bytes=40)
+    cache.put("a", 1, b"x" * 10)
+    cache.put("b", 1, b"x" * 10)
+    cache.put("c", 1, b"x" * 10)
+    cache.get("a", 1)
+    cache.put("d", 1, b"x" * 10)
+    cache.put("e", 1, b"x" * 10)
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None
+    assert cache.info()["bytes"] <= 40
+
+
+def test_stale_generation_is_a_miss():
+    cache = ResponseCache(max_bytes=100)
+    entry = cache.put("a", 1, b"{}")
+
+    assert cache.get("a", 1) == entry
+    assert cache.get("a", 2) is None
+    assert cache.info()["entries"] == 0
+
+
+def test_oversized_bodies_are_not_cached():
+    cache = ResponseCache(max_bytes=100)
+    entry = cache.put("a", 1, b"x" * 50)
+
+    assert entry.etag
+    assert cache.get("a", 1) is None
@@ -0,0 +1,35 @@
+from utils.sqlite_backend import SQLiteLogBackend
+from utils.string_store import StringStore
+
+from .test_string_store import make_record
+
+
+def test_stores_share_the_log(tmp_path):
+    path = str(tmp_path / "strings.db")
+    first = StringStore(backend=SQLiteLogBackend(path))
+    second = StringStore(backend=SQLiteLogBackend(path))
+
+    racecar = make_record("racecar")
+    assert first.add(racecar)
+    assert not second.add(racecar)
+    assert second.get(racecar["id"]).to_dict() == racecar
+
+    assert second.add(make_record("hello world"))
+    assert [r.value for r in first.query()] == ["racecar", "hello world"]
+
+    assert first.discard(racecar["id"])
+    assert racecar["id"] not in second
+    assert second.query(is_palindrome=True) == []
+
+
+def test_restart_replays_log(tmp_path):
+    path = str(tmp_path / "strings.db")
+    store = StringStore(backend=SQLiteLogBackend(path))
+    for value in ["noon", "abc", "level up"]:
+        store.add(make_record(value))
+    store.discard(make_record("abc")["id"])
+
+    reopened = StringStore(backend=SQLiteLogBackend(path))
+    assert [r.value for r in reopened.query()] == ["noon", "level up"]
+    assert [r.value for r in reopened.query(word_count=2)] == ["level up"]
+    assert reopened.seq_of(make_record("noon")["id"]) == store.seq_of(make_record("noon")["id"])
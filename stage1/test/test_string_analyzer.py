@@ -0,0 +1,178 @@
+import json
+
+import pytest
+
+from app import string_analyzer
+from app.app import app
+from utils.response_cache import ResponseCache
+from utils.string_store import StringStore
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(string_analyzer, "STRING_STORE", StringStore())
+    monkeypatch.setattr(string_analyzer, "RESULT_CACHE", ResponseCache(max_bytes=1 << 20))
+    return app.test_client()
+
+
+def test_batch_reports_per_item_status(client):
+    client.post("/strings", json={"value": "existing"})
+
+    response = client.post("/strings/batch", json=[
+        {"value": "racecar"},
+        {"value": "existing"},
+        {"value": 42},
+        {"value": "racecar"},
+    ])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [r["status"] for r in body["results"]] == [201, 409, 422, 409]
+    assert (body["created"], body["duplicates"], body["invalid"]) == (1, 2, 1)
+    assert client.get("/strings/racecar").status_code == 200
+
+
+def test_batch_accepts_ndjson(client):
+    lines = [json.dumps({"value": f"line {i}"}) for i in range(5)] + ["not json"]
+
+    response = client.post("/strings/batch", data="\n".join(lines),
+                           content_type="application/x-ndjson")
+
+    body = response.get_json()
+    assert body["created"] == 5
+    assert body["results"][-1] == {
+        "index": 5, "status": 422, "error": "Item must be an object with a string 'value'",
+    }
+    assert client.get("/strings").get_json()["count"] == 5
+
+
+def test_batch_rejects_non_array(client):
+    assert client.post("/strings/batch", json={"value": "x"}).status_code == 400
+
+
+def test_natural_language_plans_are_cached(client):
+    client.post("/strings", json={"value": "noon"})
+    client.post("/strings", json={"value": "noon at night"})
+    before = client.get("/strings/filter-by-natural-language/cache").get_json()
+
+    first = client.get("/strings/filter-by-natural-language?query=single word palindromic strings")
+    second = client.get("/strings/filter-by-natural-language?query=Single  WORD palindromic   strings")
+
+    after = client.get("/strings/filter-by-natural-language/cache").get_json()
+    assert first.get_json()["data"] == second.get_json()["data"]
+    assert [r["value"] for r in first.get_json()["data"]] == ["noon"]
+    assert after["hits"] - before["hits"] >= 1
+    assert after["misses"] - before["misses"] <= 1
+
+
+def test_list_results_are_cached_until_the_store_changes(client):
+    client.post("/strings", json={"value": "noon"})
+
+    first = client.get("/strings?is_palindrome=true&min_length=2")
+    etag = first.headers["ETag"]
+    not_modified = client.get("/strings?min_length=2&is_palindrome=true",
+                              headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert string_analyzer.RESULT_CACHE.hits == 1
+
+    client.post("/strings", json={"value": "level"})
+    changed = client.get("/strings?is_palindrome=true&min_length=2",
+                         headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["count"] == 2
+
+
+def test_natural_language_quoted_substring(client):
+    for value in ["xabcx", "ABC", "a b c"]:
+        client.post("/strings", json={"value": value})
+
+    response = client.get("/strings/filter-by-natural-language?query=strings containing 'abc'")
+
+    body = response.get_json()
+    assert body["interpreted_query"]["parsed_filters"] == {"contains_character": "abc"}
+    assert [r["value"] for r in body["data"]] == ["xabcx"]
+
+
+def page_through(client, url, limit):
+    values, cursor, pages = [], None, 0
+    while True:
+        params = f"limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        body = client.get(f"{url}{'&' if '?' in url else '?'}{params}").get_json()
+        assert body["count"] == len(body["data"]) <= limit
+        values.extend(r["value"] for r in body["data"])
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return values, pages
+
+
+@pytest.mark.parametrize("url", [
+    "/strings",
+    "/strings?min_length=3",
+    "/strings/filter-by-natural-language?query=strings longer than 2 characters",
+])
+def test_pages_follow_next_cursor_to_the_end(client, url):
+    for i in range(7):
+        client.post("/strings", json={"value": f"value {i}"})
+    client.post("/strings", json={"value": "ab"})
+
+    everything = [r["value"] for r in client.get(url).get_json()["data"]]
+    values, pages = page_through(client, url, limit=3)
+
+    assert len(everything) >= 7
+    assert values == everything
+    assert pages == -(-len(everything) // 3)
+
+
+def test_unpaged_list_has_no_next_cursor(client):
+    client.post("/strings", json={"value": "noon"})
+
+    assert "next_cursor" not in client.get("/strings").get_json()
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=-1", "limit=ten", "cursor=abc"])
+def test_invalid_page_args_are_400(client, query):
+    response = client.get(f"/strings?{query}")
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("url", [
+    "/strings?limit=2",
+    "/strings?limit=10",
+    "/strings?min_length=3&limit=2",
+    "/strings/filter-by-natural-language?query=single word palindromic strings&limit=1",
+])
+def test_streamed_body_matches_buffered(client, url):
+    for value in ["noon", "level", "abc", "hello world", "racecar"]:
+        client.post("/strings", json={"value": value})
+
+    buffered = client.get(url).get_json()
+    streamed = client.get(f"{url}&stream=true")
+
+    assert streamed.mimetype == "application/json"
+    assert json.loads(streamed.get_data(as_text=True)) == buffered
+
+
+def test_streamed_body_without_matches_is_valid_json(client):
+    streamed = client.get("/strings?min_length=100&stream=true")
+
+    assert json.loads(streamed.get_data(as_text=True))["data"] == []
+
+
+@pytest.mark.parametrize("query, filters, values", [
+    ("strings containing 'palindrome'", {"contains_character": "palindrome"}, ["a palindrome here"]),
+    ('strings containing "longer than 3"', {"contains_character": "longer than 3"}, ["longer than 3"]),
+    ("palindromic strings containing 'single word'",
+     {"contains_character": "single word", "is_palindrome": True}, []),
+])
+def test_keywords_inside_quotes_are_not_filters(client, query, filters, values):
+    for value in ["a palindrome here", "noon", "longer than 3", "single word"]:
+        client.post("/strings", json={"value": value})
+
+    body = client.get(f"/strings/filter-by-natural-language?query={query}").get_json()
+
+    assert body["interpreted_query"]["parsed_filters"] == filters
+    assert [r["value"] for r in body["data"]] == values
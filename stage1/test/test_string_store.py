@@ -0,0 +1,171 @@
+import random
+import threading
+from collections import Counter
+
+from utils.compute_properties import compute_properties
+from utils.stored_string import StoredString
+from utils.string_store import StringStore
+
+
+def make_record(value):
+    props = compute_properties(value)
+    return {
+        "id": props["sha256_hash"],
+        "value": value,
+        "properties": props,
+        "created_at": "2025-01-01T00:00:00Z",
+    }
+
+
+def linear_filter(records, is_palindrome=None, min_length=None, max_length=None,
+                  word_count=None, contains_character=None):
+    """The list comprehensions the indexed store replaced."""
+    results = list(records)
+    if is_palindrome is not None:
+        results = [r for r in results if r["properties"]["is_palindrome"] == is_palindrome]
+    if min_length is not None:
+        results = [r for r in results if r["properties"]["length"] >= min_length]
+    if max_length is not None:
+        results = [r for r in results if r["properties"]["length"] <= max_length]
+    if word_count is not None:
+        results = [r for r in results if r["properties"]["word_count"] == word_count]
+    if contains_character:
+        results = [r for r in results if contains_character in r["value"]]
+    return results
+
+
+def random_value(rng):
+    words = ["racecar", "level", "abc", "hello", "a", "noon", "xyz", "ab ba"]
+    return " ".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+
+
+def test_query_matches_linear_filters():
+    rng = random.Random(7)
+    store = StringStore()
+    reference = {}
+
+    for _ in range(400):
+        record = make_record(random_value(rng))
+        if record["id"] not in store:
+            store[record["id"]] = record
+            reference[record["id"]] = record
+
+    for string_id in rng.sample(list(reference), 60):
+        del store[string_id]
+        del reference[string_id]
+
+    cases = [
+        {},
+        {"is_palindrome": True},
+        {"is_palindrome": False},
+        {"min_length": 5, "max_length": 12},
+        {"max_length": 3},
+        {"word_count": 2},
+        {"contains_character": "z"},
+        {"contains_character": "ce"},
+        {"contains_character": "q"},
+        {"contains_character": "race"},
+        {"contains_character": "lo noo"},
+        {"contains_character": "abcd"},
+        {"contains_character": "xyz a", "word_count": 3},
+        {"is_palindrome": True, "word_count": 1, "min_length": 4},
+        {"min_length": 10, "contains_character": "o", "word_count": 3},
+        {"min_length": 9, "max_length": 2},
+    ]
+    for filters in cases:
+        assert [r.to_dict() for r in store.query(**filters)] == linear_filter(reference.values(), **filters), filters
+
+
+def test_delete_removes_from_indexes():
+    store = StringStore()
+    record = make_record("racecar")
+    store[record["id"]] = record
+    del store[record["id"]]
+
+    assert record["id"] not in store
+    assert store.query(is_palindrome=True) == []
+    assert store.query(contains_character="r") == []
+    assert store.query(min_length=0) == []
+
+
+def test_iter_query_resumes_after_cursor():
+    store = StringStore()
+    for value in ["aa", "b", "cc", "d", "ee", "f"]:
+        record = make_record(value)
+        store[record["id"]] = record
+
+    first = []
+    for seq, record in store.iter_query(min_length=0):
+        first.append(record.value)
+        if len(first) == 2:
+            break
+    rest = [r.value for _, r in store.iter_query(min_length=0, after=seq)]
+    assert first + rest == ["aa", "b", "cc", "d", "ee", "f"]
+
+    # Driven by the (small) length index and resumed from the middle.
+    paged = [r.value for _, r in store.iter_query(max_length=1, after=store.seq_of(make_record("b")["id"]))]
+    assert paged == ["d", "f"]
+
+
+def test_concurrent_adds_insert_once_while_queried():
+    records = [make_record(f"value {i} {'x' * (i % 7)}") for i in range(300)]
+    store = StringStore()
+    inserted = Counter()
+    errors = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def writer():
+        for record in records:
+            if store.add(record):
+                with lock:
+                    inserted[record["id"]] += 1
+
+    def reader():
+        try:
+            while not done.is_set():
+                list(store.iter_query(min_length=8))
+                list(store.iter_query(contains_character="x", word_count=3))
+        except Exception as e:
+            errors.append(e)
+
+    writers = [threading.Thread(target=writer) for _ in range(4)]
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    done.set()
+    for t in readers:
+        t.join()
+
+    assert not errors
+    assert len(store) == len(records)
+    assert set(inserted.values()) == {1}
+    assert [r.to_dict() for r in store.query(min_length=8)] == linear_filter(records, min_length=8)
+
+
+def test_substring_search_covers_unindexed_long_values(monkeypatch):
+    monkeypatch.setattr("utils.string_store.TRIGRAM_MAX_LENGTH", 10)
+    store = StringStore()
+    for value in ["short abc", "a much longer value with abc inside", "no match here at all"]:
+        record = make_record(value)
+        store[record["id"]] = record
+
+    assert [r.value for r in store.query(contains_character="abc")] == [
+        "short abc", "a much longer value with abc inside",
+    ]
+    stats = store.index_stats()
+    assert stats["unindexed_long_values"] == 2
+    assert stats["trigram_keys"] == 7
+
+
+def test_stored_string_round_trips_record_shape():
+    record = make_record("  Ünïcode ünï  ")
+    record["created_at"] = "2025-03-04T05:06:07.089012Z"
+
+    stored = StoredString.from_dict(record)
+
+    assert stored.to_dict() == record
+    assert len(stored.digest) == 32
+    assert list(stored.to_dict()["properties"]) == list(record["properties"])
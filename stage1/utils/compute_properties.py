@@ -1,4 +1,73 @@
+import codecs
 import hashlib
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Large strings are processed in slices of this many characters, so no
+# step holds more than one extra slice-sized copy of the input.
+CHUNK_SIZE = 1 << 16
+
+
+class PropertyAccumulator:
+    """Incrementally computes string properties over consecutive pieces.
+
+    Each piece is hashed and counted once: character counts use
+    ``Counter.update`` (C-level counting) and words are counted per piece,
+    joining words split across piece boundaries, instead of building the
+    full ``split()`` list.
+    """
+
+    def __init__(self):
+        self._sha = hashlib.sha256()
+        self._counts = Counter()
+        self._length = 0
+        self._words = 0
+        self._in_word = False
+
+    def feed(self, text: str):
+        if not text:
+            return
+        self._sha.update(text.encode())
+        self._counts.update(text)
+        self._length += len(text)
+
+        words = len(text.split())
+        if words and self._in_word and not text[0].isspace():
+            words -= 1
+        self._words += words
+        self._in_word = not text[-1].isspace()
+
+    def properties(self, is_palindrome: bool) -> dict:
+        return {
+            "length": self._length,
+            "is_palindrome": is_palindrome,
+            "unique_characters": len(self._counts),
+            "word_count": self._words,
+            "sha256_hash": self._sha.hexdigest(),
+            "character_frequency_map": dict(self._counts),
+        }
+
+
+def is_palindrome(value: str) -> bool:
+    """Case-insensitive palindrome check.
+
+    ASCII strings are compared slice by slice from both ends, stopping at
+    the first mismatch, without lowercased or reversed copies of the whole
+    string. Other strings use the full comparison, since lowercasing can
+    change their length or depend on context (e.g. final sigma).
+    """
+    if not value.isascii():
+        return value.lower() == value[::-1].lower()
+
+    n = len(value)
+    for start in range(0, n // 2, CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, n // 2)
+        front = value[start:end].lower()
+        back = value[n - end:n - start][::-1].lower()
+        if front != back:
+            return False
+    return True
 
 
 def compute_properties(value: str) -> dict:
@@ -11,16 +80,94 @@ def compute_properties(value: str) -> dict:
         dict: The computed properties.
     """
     cleaned = value.strip()
-    hash_val = hashlib.sha256(cleaned.encode()).hexdigest()
-    freq_map = {}
-    for ch in cleaned:
-        freq_map[ch] = freq_map.get(ch, 0) + 1
-
-    return {
-        "length": len(cleaned),
-        "is_palindrome": cleaned.lower() == cleaned[::-1].lower(),
-        "unique_characters": len(set(cleaned)),
-        "word_count": len(cleaned.split()),
-        "sha256_hash": hash_val,
-        "character_frequency_map": freq_map,
-    }
+    acc = PropertyAccumulator()
+    for start in range(0, len(cleaned), CHUNK_SIZE):
+        acc.feed(cleaned[start:start + CHUNK_SIZE])
+
+    return acc.properties(is_palindrome(cleaned))
+
+
+def compute_properties_stream(chunks) -> tuple:
+    """Compute string properties while reading UTF-8 bytes.
+
+    Hashing, character and word counting happen as the chunks arrive;
+    leading and trailing whitespace is excluded the same way
+    ``compute_properties`` strips it.
+
+    Args:
+        chunks (Iterable[bytes]): The raw bytes, e.g. a request body stream.
+
+    Returns:
+        tuple: (value, properties) where value is the full decoded string.
+
+    Raises:
+        UnicodeDecodeError: If the bytes are not valid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    acc = PropertyAccumulator()
+    leading, parts, pending = [], [], ""
+
+    def consume(text):
+        nonlocal pending
+        if not parts and not pending:
+            stripped = text.lstrip()
+            leading.append(text[:len(text) - len(stripped)])
+            text = stripped
+            if not text:
+                return
+        body = text.rstrip()
+        if body:
+            # Whitespace held back from the previous piece turned out to be
+            # inside the string after all.
+            piece = pending + body
+            acc.feed(piece)
+            parts.append(piece)
+            pending = text[len(body):]
+        else:
+            pending += text
+
+    for chunk in chunks:
+        consume(decoder.decode(chunk))
+    consume(decoder.decode(b"", final=True))
+
+    cleaned = "".join(parts)
+    value = "".join(leading) + cleaned + pending
+    return value, acc.properties(is_palindrome(cleaned))
+
+
+# Batches smaller than this are computed in-process; shipping them to the
+# pool costs more than it saves.
+POOL_MIN_BATCH = 256
+
+_pool = None
+
+
+def _pool_workers() -> int:
+    return int(os.environ.get("STRING_BATCH_WORKERS", os.cpu_count() or 1))
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=_pool_workers())
+    return _pool
+
+
+def compute_properties_many(values: list) -> list:
+    """Compute properties for many strings, across a process pool when large.
+
+    The pool is created on first use, so each gunicorn worker process gets
+    its own.
+
+    Args:
+        values (list[str]): The strings to compute.
+
+    Returns:
+        list[dict]: The computed properties, in the order of ``values``.
+    """
+    workers = _pool_workers()
+    if len(values) < POOL_MIN_BATCH or workers < 2:
+        return [compute_properties(value) for value in values]
+
+    chunksize = max(1, len(values) // (workers * 4))
+    return list(_get_pool().map(compute_properties, values, chunksize=chunksize))
@@ -1,25 +1,81 @@
-def parse_natural_language(query: str):
-    """Simple keyword-based query parser for demonstration."""
-    q = query.lower()
+import re
+from functools import lru_cache
+
+# Distinct normalized phrasings whose compiled plans are kept.
+PLAN_CACHE_SIZE = 256
+
+_QUOTED = re.compile(r"""('[^']*'|"[^"]*")""")
+_CONTAINS_QUOTED = re.compile(r"""contain(?:s|ing)\s+(?:the\s+(?:substring|text)\s+)?(['"])(.+?)\1""")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and collapse its whitespace, the plan cache key.
+
+    Quoted text (a substring to search for) is kept as written.
+    """
+    parts = _QUOTED.split(query)
+    for i in range(0, len(parts), 2):
+        # Pad with the single space that separated this text from an
+        # adjacent quote; the outer ends are stripped below.
+        text = parts[i]
+        words = text.lower().split()
+        if not words:
+            parts[i] = " " if text else ""
+            continue
+        lead = " " if text[0].isspace() else ""
+        trail = " " if text[-1].isspace() else ""
+        parts[i] = lead + " ".join(words) + trail
+    return "".join(parts).strip()
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _compile_plan(q: str) -> tuple:
+    """Compile a normalized query into sorted (filter, value) pairs."""
     filters = {}
+    # Keywords only count outside quotes: 'palindrome' is text to search for.
+    text = _QUOTED.sub("", q)
 
-    if "palindromic" in q or "palindrome" in q:
+    if "palindromic" in text or "palindrome" in text:
         filters["is_palindrome"] = True
-    if "single word" in q or "one word" in q:
+    if "single word" in text or "one word" in text:
         filters["word_count"] = 1
-    if "longer than" in q:
+    if "longer than" in text:
         try:
-            num = int(q.split("longer than")[1].split()[0])
+            num = int(text.split("longer than")[1].split()[0])
             filters["min_length"] = num + 1
         except Exception:
             pass
 
-    if "containing the letter" in q:
+    quoted = _CONTAINS_QUOTED.search(q)
+    if quoted:
+        filters["contains_character"] = quoted.group(2)
+    elif "containing the letter" in text:
         letter = q.split("containing the letter")[-1].strip().split()[0]
         filters["contains_character"] = letter
-    elif "containing the" in q:
+    elif "containing the" in text:
         # fallback for "first vowel"
-        if "first vowel" in q:
+        if "first vowel" in text:
             filters["contains_character"] = "a"
 
-    return filters
+    return tuple(sorted(filters.items()))
+
+
+def parse_natural_language(query: str) -> dict:
+    """Simple keyword-based query parser for demonstration.
+
+    Returns a filter plan whose keys are ``StringStore.query`` arguments.
+    Plans are cached per normalized query, so repeated phrasings skip
+    parsing entirely.
+    """
+    return dict(_compile_plan(normalize_query(query)))
+
+
+def plan_cache_info() -> dict:
+    """Hit/miss counters and occupancy of the plan cache."""
+    info = _compile_plan.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+    }
@@ -0,0 +1,66 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+CachedResponse = namedtuple("CachedResponse", ["generation", "etag", "body"])
+
+
+class ResponseCache:
+    """LRU cache of serialized response bodies, bounded by total bytes.
+
+    Entries are tagged with the store generation they were built from and
+    ignored once the store has moved on, so writes invalidate every cached
+    result without having to find the affected keys.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, generation):
+        """Return the entry for ``key`` if it was built at ``generation``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.generation != generation:
+                if entry is not None:
+                    self._evict(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, generation, body: bytes) -> CachedResponse:
+        """Store a body and return its entry, with an ETag over the bytes.
+
+        Bodies larger than a quarter of the budget are returned uncached
+        rather than flushing everything else.
+        """
+        entry = CachedResponse(generation, hashlib.blake2b(body, digest_size=16).hexdigest(), body)
+        if len(body) > self.max_bytes // 4:
+            return entry
+
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+        return entry
+
+    def info(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _evict(self, key):
+        self._bytes -= len(self._entries.pop(key).body)
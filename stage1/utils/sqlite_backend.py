@@ -0,0 +1,100 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS string_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    string_id TEXT NOT NULL,
+    record TEXT
+)
+"""
+
+
+class SQLiteLogBackend:
+    """Append-only operation log in a SQLite file, shared by all workers.
+
+    Every insert and delete is appended as a ``put``/``del`` row and the
+    log sequence number doubles as the record's insertion order. Stores
+    replay rows they have not seen yet, so startup never recomputes string
+    properties and each worker picks up the others' writes.
+
+    The file runs in WAL mode with ``synchronous=NORMAL``: commits only
+    append to the WAL and fsync is batched into checkpoints. Reads go
+    through a memory-mapped view of the database.
+    """
+
+    def __init__(self, path: str, mmap_size: int = 256 * 1024 * 1024):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(SCHEMA)
+        self._data_version = None
+
+    @contextmanager
+    def transaction(self):
+        """Hold the database write lock across a read-check-append sequence."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def changed(self) -> bool:
+        """Whether another connection committed since the last call.
+
+        ``PRAGMA data_version`` is answered without touching the log table,
+        which keeps the per-request freshness check cheap.
+        """
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            changed = version != self._data_version
+            self._data_version = version
+        return changed
+
+    def read_since(self, seq: int):
+        """Return ``(seq, op, string_id, record)`` rows appended after ``seq``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, op, string_id, record FROM string_log WHERE seq > ? ORDER BY seq",
+                (seq,),
+            ).fetchall()
+        return [
+            (row_seq, op, string_id, json.loads(record) if record is not None else None)
+            for row_seq, op, string_id, record in rows
+        ]
+
+    def append(self, op: str, string_id: str, record: dict | None = None) -> int:
+        """Append one operation and return its sequence number.
+
+        Call inside ``transaction`` so the caller's existence check and the
+        append are atomic across workers.
+        """
+        payload = json.dumps(record, separators=(",", ":")) if record is not None else None
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO string_log (op, string_id, record) VALUES (?, ?, ?)",
+                (op, string_id, payload),
+            )
+        return cursor.lastrowid
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def backend_from_env(environ) -> SQLiteLogBackend | None:
+    """Build the backend configured by ``STRING_STORE_PATH``, if any."""
+    path = environ.get("STRING_STORE_PATH")
+    if not path:
+        return None
+    return SQLiteLogBackend(path)
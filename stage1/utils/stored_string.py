@@ -0,0 +1,85 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class StoredString:
+    """Compact in-memory form of an analyzed string.
+
+    Holds what the API record needs in slots instead of nested dicts: the
+    SHA-256 digest as 32 raw bytes (the same object keys the store and its
+    indexes), the creation time as integer microseconds since the epoch and
+    the character frequency map packed as a string of distinct characters
+    plus a parallel array of counts. ``id``, ``sha256_hash`` and
+    ``unique_characters`` are derived. ``to_dict`` expands it to the
+    record shape the API returns.
+    """
+
+    __slots__ = ("digest", "value", "length", "is_palindrome", "word_count",
+                 "created_at_us", "chars", "counts")
+
+    def __init__(self, digest: bytes, value: str, length: int, is_palindrome: bool,
+                 word_count: int, created_at_us: int, chars: str, counts: array):
+        self.digest = digest
+        self.value = value
+        self.length = length
+        self.is_palindrome = is_palindrome
+        self.word_count = word_count
+        self.created_at_us = created_at_us
+        self.chars = chars
+        self.counts = counts
+
+    @classmethod
+    def create(cls, value: str, props: dict, created_at: datetime = None) -> "StoredString":
+        """Build from a value and its ``compute_properties`` result.
+
+        Args:
+            value (str): The original string.
+            props (dict): Its computed properties.
+            created_at (datetime): Creation time, defaults to now (UTC).
+        """
+        created_at = created_at or datetime.now(timezone.utc)
+        freq = props["character_frequency_map"]
+        return cls(
+            digest=bytes.fromhex(props["sha256_hash"]),
+            value=value,
+            length=props["length"],
+            is_palindrome=props["is_palindrome"],
+            word_count=props["word_count"],
+            created_at_us=(created_at - _EPOCH) // timedelta(microseconds=1),
+            chars="".join(freq),
+            counts=array("I", freq.values()),
+        )
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "StoredString":
+        """Build from the API record shape, e.g. a replayed log entry."""
+        created_at = datetime.fromisoformat(record["created_at"].replace("Z", "+00:00"))
+        return cls.create(record["value"], record["properties"], created_at)
+
+    @property
+    def id(self) -> str:
+        return self.digest.hex()
+
+    @property
+    def created_at(self) -> str:
+        moment = _EPOCH + timedelta(microseconds=self.created_at_us)
+        return moment.isoformat().replace("+00:00", "Z")
+
+    def to_dict(self) -> dict:
+        """Expand to the JSON record shape returned by the API."""
+        string_id = self.id
+        return {
+            "id": string_id,
+            "value": self.value,
+            "properties": {
+                "length": self.length,
+                "is_palindrome": self.is_palindrome,
+                "unique_characters": len(self.chars),
+                "word_count": self.word_count,
+                "sha256_hash": string_id,
+                "character_frequency_map": dict(zip(self.chars, self.counts)),
+            },
+            "created_at": self.created_at,
+        }
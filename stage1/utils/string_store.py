@@ -0,0 +1,469 @@
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+
+from utils.stored_string import StoredString
+
+# Entries copied per lock acquisition when a query walks the whole store.
+SCAN_BATCH = 1024
+
+# Values longer than this are left out of the trigram index, which would
+# otherwise grow with their length; substring searches always check them.
+TRIGRAM_MAX_LENGTH = 4096
+
+_EMPTY = frozenset()
+
+
+class SortedIndex:
+    """Sorted (key, seq, id) entries supporting range lookups.
+
+    Entries are ordered by key first and insertion sequence second, so a
+    range slice is already in a stable order.
+    """
+
+    def __init__(self):
+        self._entries = []
+
+    def add(self, key, seq, string_id):
+        insort(self._entries, (key, seq, string_id))
+
+    def remove(self, key, seq, string_id):
+        entry = (key, seq, string_id)
+        pos = bisect_left(self._entries, entry)
+        if pos < len(self._entries) and self._entries[pos] == entry:
+            del self._entries[pos]
+
+    def _bounds(self, lo=None, hi=None):
+        start = 0 if lo is None else bisect_left(self._entries, (lo,))
+        end = len(self._entries) if hi is None else bisect_right(self._entries, (hi, float("inf")))
+        return start, max(start, end)
+
+    def size_bytes(self) -> int:
+        """Approximate memory held by the entry list and its tuples."""
+        return sys.getsizeof(self._entries) + sum(map(sys.getsizeof, self._entries))
+
+    def count(self, lo=None, hi=None) -> int:
+        """Number of entries with lo <= key <= hi, in O(log n)."""
+        start, end = self._bounds(lo, hi)
+        return end - start
+
+    def ids(self, lo=None, hi=None) -> list:
+        """Ids of entries with lo <= key <= hi, copied at C speed."""
+        start, end = self._bounds(lo, hi)
+        return list(map(itemgetter(2), self._entries[start:end]))
+
+
+class StringStore:
+    """String store with secondary indexes for list filters.
+
+    Behaves like the ``{sha256_hash: record}`` dict it replaces, keyed by
+    the hex id, but holds compact ``StoredString`` records keyed internally
+    by their 32-byte digest. Dict records are accepted on insert and
+    converted. The following indexes are kept in sync on every insert and
+    delete:
+
+    - ``length`` and ``word_count``: sorted indexes for range/equality filters
+    - ``is_palindrome``: the set of palindromic ids (a bitmap over ids)
+    - characters: an inverted index from character to the ids containing it
+    - trigrams: an inverted index from each 3-character substring to the
+      ids containing it, for multi-character ``contains_character`` searches
+
+    ``query`` estimates the size of every candidate set, materializes only
+    the smallest one and checks the remaining filters per candidate.
+
+    The store is safe to share between threads. Writers serialize on one
+    lock; readers take it only to copy a snapshot of their candidate ids
+    (C-level set/list copies), then check filters, resolve records and
+    serialize without it, skipping records deleted in the meantime. So a
+    long or slow read never holds up inserts and deletes.
+
+    Records live in memory only, unless a ``backend`` (see
+    ``utils.sqlite_backend``) is given: writes are then appended to its
+    shared log and every access first replays entries appended since the
+    last one, including those written by other processes.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._write_lock = threading.RLock()
+        self._log_seq = 0
+        self._generation = 0
+        self._records = {}
+        self._seq = {}
+        self._order = []
+        self._next_seq = 0
+        self._by_length = SortedIndex()
+        self._by_word_count = SortedIndex()
+        self._palindromes = set()
+        self._by_char = {}
+        self._by_trigram = {}
+        self._long_ids = set()
+        self._sync()
+
+    # -- dict interface -------------------------------------------------
+
+    def __contains__(self, string_id):
+        self._sync()
+        return _key(string_id) in self._records
+
+    def __getitem__(self, string_id):
+        self._sync()
+        return self._records[_key(string_id)]
+
+    def __len__(self):
+        self._sync()
+        return len(self._records)
+
+    def __iter__(self):
+        self._sync()
+        return iter([digest.hex() for digest in list(self._records)])
+
+    def get(self, string_id, default=None):
+        self._sync()
+        return self._records.get(_key(string_id), default)
+
+    def values(self) -> list:
+        """Snapshot of the stored records."""
+        self._sync()
+        return list(self._records.values())
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every insert and delete.
+
+        With a backend every process applies the same log, so the counter
+        agrees across workers.
+        """
+        self._sync()
+        return self._generation
+
+    def seq_of(self, string_id) -> int:
+        """Insertion sequence number of a stored id, used as a page cursor."""
+        return self._seq[_key(string_id)]
+
+    def __setitem__(self, string_id, record):
+        record = _coerce(record)
+        key = record.digest
+        with self._write_lock:
+            if self._backend is None:
+                if key in self._records:
+                    self._apply_delete(key)
+                self._apply_put(self._next_seq, record)
+                self._next_seq += 1
+                return
+
+            with self._backend.transaction():
+                self._sync()
+                if key in self._records:
+                    self._apply_delete(key)
+                    self._log_seq = self._backend.append("del", record.id)
+                self._log_seq = self._backend.append("put", record.id, record.to_dict())
+                self._apply_put(self._log_seq, record)
+
+    def __delitem__(self, string_id):
+        if not self.discard(string_id):
+            raise KeyError(string_id)
+
+    # -- atomic writes --------------------------------------------------
+
+    def add(self, record) -> bool:
+        """Insert a record unless its id is already stored.
+
+        The check and the insert are one step, also across processes
+        sharing a backend.
+
+        Returns:
+            bool: False if the id already existed.
+        """
+        return self.add_many([record])[0]
+
+    def add_many(self, records) -> list:
+        """Insert several records under one lock (and one backend transaction).
+
+        Records whose id is already stored, including earlier in the same
+        batch, are skipped.
+
+        Returns:
+            list[bool]: Whether each record was inserted.
+        """
+        records = [_coerce(record) for record in records]
+        with self._write_lock:
+            if self._backend is None:
+                return [self._insert(record, self._next_seq) for record in records]
+
+            with self._backend.transaction():
+                self._sync()
+                return [self._insert(record) for record in records]
+
+    def _insert(self, record, seq=None) -> bool:
+        if record.digest in self._records:
+            return False
+        if seq is None:
+            seq = self._log_seq = self._backend.append("put", record.id, record.to_dict())
+        else:
+            self._next_seq += 1
+        self._apply_put(seq, record)
+        return True
+
+    def discard(self, string_id) -> bool:
+        """Delete a record if present.
+
+        Returns:
+            bool: False if the id was not stored.
+        """
+        key = _key(string_id)
+        with self._write_lock:
+            if self._backend is None:
+                if key not in self._records:
+                    return False
+                self._apply_delete(key)
+                return True
+
+            with self._backend.transaction():
+                self._sync()
+                if key not in self._records:
+                    return False
+                self._log_seq = self._backend.append("del", key.hex())
+                self._apply_delete(key)
+            return True
+
+    # -- index maintenance ----------------------------------------------
+
+    def _sync(self):
+        """Replay backend log entries appended since the last sync."""
+        if self._backend is None:
+            return
+        with self._write_lock:
+            if not self._backend.changed():
+                return
+            for seq, op, string_id, record in self._backend.read_since(self._log_seq):
+                if op == "put":
+                    self._apply_put(seq, StoredString.from_dict(record))
+                elif _key(string_id) in self._records:
+                    self._apply_delete(_key(string_id))
+                self._log_seq = seq
+
+    def _apply_put(self, seq, record):
+        self._generation += 1
+        key = record.digest
+        self._records[key] = record
+        self._seq[key] = seq
+        self._order.append((seq, key))
+
+        self._by_length.add(record.length, seq, key)
+        self._by_word_count.add(record.word_count, seq, key)
+        if record.is_palindrome:
+            self._palindromes.add(key)
+        for ch in set(record.value):
+            self._by_char.setdefault(ch, set()).add(key)
+        if len(record.value) > TRIGRAM_MAX_LENGTH:
+            self._long_ids.add(key)
+        else:
+            for gram in _trigrams(record.value):
+                self._by_trigram.setdefault(gram, set()).add(key)
+
+    def _apply_delete(self, key):
+        self._generation += 1
+        record = self._records.pop(key)
+        seq = self._seq.pop(key)
+        pos = bisect_left(self._order, (seq,))
+        if pos < len(self._order) and self._order[pos][0] == seq:
+            del self._order[pos]
+
+        self._by_length.remove(record.length, seq, key)
+        self._by_word_count.remove(record.word_count, seq, key)
+        self._palindromes.discard(key)
+        _unindex(self._by_char, set(record.value), key)
+        if len(record.value) > TRIGRAM_MAX_LENGTH:
+            self._long_ids.discard(key)
+        else:
+            _unindex(self._by_trigram, _trigrams(record.value), key)
+
+    def index_stats(self) -> dict:
+        """Entry counts and approximate memory footprint of each index.
+
+        Sizes come from ``sys.getsizeof`` of the index containers and
+        their keys; the ids they reference are shared with the records and
+        not counted.
+        """
+        with self._write_lock:
+            by_char = list(self._by_char.items())
+            by_trigram = list(self._by_trigram.items())
+            stats = {
+                "records": len(self._records),
+                "length_bytes": self._by_length.size_bytes(),
+                "word_count_bytes": self._by_word_count.size_bytes(),
+                "palindrome_bytes": sys.getsizeof(self._palindromes),
+                "unindexed_long_values": len(self._long_ids),
+            }
+
+        for name, items in (("char", by_char), ("trigram", by_trigram)):
+            stats[f"{name}_keys"] = len(items)
+            stats[f"{name}_postings"] = sum(len(ids) for _, ids in items)
+            stats[f"{name}_bytes"] = sum(sys.getsizeof(k) + sys.getsizeof(ids) for k, ids in items)
+        return stats
+
+    # -- filtering ------------------------------------------------------
+
+    def query(self, is_palindrome=None, min_length=None, max_length=None,
+              word_count=None, contains_character=None) -> list:
+        """Return the records matching every given filter.
+
+        Results come back in insertion order, as iterating the plain dict
+        did. Filters left as ``None`` are ignored.
+        """
+        return [record for _, record in self.iter_query(
+            is_palindrome=is_palindrome,
+            min_length=min_length,
+            max_length=max_length,
+            word_count=word_count,
+            contains_character=contains_character,
+        )]
+
+    def iter_query(self, is_palindrome=None, min_length=None, max_length=None,
+                   word_count=None, contains_character=None, after=None):
+        """Lazily yield ``(seq, record)`` pairs matching every given filter.
+
+        Pairs come in insertion order, starting after sequence ``after``
+        when given, so a caller can stop after one page without the rest of
+        the result ever being built.
+        """
+        self._sync()
+
+        with self._write_lock:
+            plans = self._plans(is_palindrome, min_length, max_length, word_count, contains_character)
+            plans.sort(key=lambda p: p[0])
+            if plans and plans[0][0] * 2 <= len(self._records):
+                size, snapshot, driver_check, exact = plans[0]
+                candidates = snapshot() if size else []
+            else:
+                candidates = None
+
+        if candidates is None:
+            # Most of the store matches anyway: walk it in order from the
+            # cursor and stop whenever the caller does.
+            yield from self._scan_ordered(_combine([p[2] for p in plans]), after)
+            return
+
+        checks = [p[2] for p in plans[1:]]
+        if not exact:
+            checks.append(driver_check)
+        accept = _combine(checks)
+
+        matched = []
+        for string_id in candidates:
+            seq = self._seq.get(string_id)
+            if seq is None or (after is not None and seq <= after):
+                continue
+            record = self._records.get(string_id)
+            if record is not None and accept(string_id, record):
+                matched.append((seq, string_id))
+
+        matched.sort()
+        for seq, string_id in matched:
+            record = self._records.get(string_id)
+            if record is not None:
+                yield seq, record
+
+    def _plans(self, is_palindrome, min_length, max_length, word_count, contains_character) -> list:
+        """Candidate plans for each filter; call with the write lock held.
+
+        Each plan is (estimated size, candidate id snapshot, per-record
+        check, exact). An exact plan yields only matching ids, so its check
+        can be skipped when it drives the scan.
+        """
+        plans = []
+
+        if is_palindrome is not None:
+            if is_palindrome:
+                plans.append((len(self._palindromes), lambda: list(self._palindromes),
+                              lambda i, r: i in self._palindromes, True))
+            else:
+                plans.append((len(self._records) - len(self._palindromes),
+                              lambda: list(self._records.keys() - self._palindromes),
+                              lambda i, r: i not in self._palindromes, True))
+
+        if min_length is not None or max_length is not None:
+            plans.append((self._by_length.count(min_length, max_length),
+                          lambda: self._by_length.ids(min_length, max_length),
+                          lambda i, r: _in_range(r.length, min_length, max_length),
+                          True))
+
+        if word_count is not None:
+            plans.append((self._by_word_count.count(word_count, word_count),
+                          lambda: self._by_word_count.ids(word_count, word_count),
+                          lambda i, r: r.word_count == word_count, True))
+
+        if contains_character:
+            # Every trigram (or character, for short needles) must occur, so
+            # intersecting their postings from the rarest one up bounds the
+            # result; anything longer than one character still needs the
+            # substring check.
+            if len(contains_character) >= 3:
+                postings = [self._by_trigram.get(g, _EMPTY) for g in _trigrams(contains_character)]
+                unindexed = self._long_ids
+            else:
+                postings = [self._by_char.get(ch, _EMPTY) for ch in set(contains_character)]
+                unindexed = _EMPTY
+            postings.sort(key=len)
+            plans.append((len(postings[0]) + len(unindexed),
+                          lambda: list(postings[0].intersection(*postings[1:]).union(unindexed)),
+                          lambda i, r: contains_character in r.value,
+                          len(contains_character) == 1))
+
+        return plans
+
+    def _scan_ordered(self, accept, after):
+        while True:
+            with self._write_lock:
+                start = 0 if after is None else bisect_left(self._order, (after + 1,))
+                batch = self._order[start:start + SCAN_BATCH]
+            if not batch:
+                return
+
+            for seq, string_id in batch:
+                record = self._records.get(string_id)
+                if record is not None and accept(string_id, record):
+                    yield seq, record
+            after = batch[-1][0]
+
+
+def _key(string_id):
+    """Internal digest key for a hex id; None if it cannot be one."""
+    if isinstance(string_id, bytes):
+        return string_id
+    try:
+        return bytes.fromhex(string_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _coerce(record) -> StoredString:
+    return record if isinstance(record, StoredString) else StoredString.from_dict(record)
+
+
+def _combine(checks):
+    """Fold per-record checks into one callable, avoiding ``all()`` overhead."""
+    if not checks:
+        return lambda i, r: True
+    if len(checks) == 1:
+        return checks[0]
+    return lambda i, r: all(check(i, r) for check in checks)
+
+
+def _trigrams(value: str) -> set:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _unindex(index, keys, string_id):
+    for key in keys:
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(string_id)
+            if not ids:
+                del index[key]
+
+
+def _in_range(value, lo, hi) -> bool:
+    return (lo is None or value >= lo) and (hi is None or value <= hi)
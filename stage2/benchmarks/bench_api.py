@@ -0,0 +1,228 @@
+"""Throughput and p50/p99 latency of the API across dataset sizes.
+
+For each size, seeds a fresh SQLite database through POST /countries/refresh
+against stub upstream APIs, then drives the app in-process with the Flask
+test client, one request at a time:
+
+- GET /countries with every combination of region, currency and sort
+- GET /countries/<name>, cycling through the seeded names
+- GET /status
+- POST /countries/refresh, timed from submission until the job finishes,
+  with the upstreams unchanged, with every population changed, and with
+  only the exchange rates changed
+
+Results are written as JSON, tagged with the git commit, so two runs can be
+compared with ``benchmarks.compare``. The response cache is disabled unless
+``--cache`` is given, so reads measure the database and serialization.
+
+Run from the stage2 directory:
+
+    python -m benchmarks.bench_api --sizes 250,10000,100000 --output bench-results/head.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import sqlalchemy
+
+from benchmarks.stub_upstream import StubUpstream, make_countries
+from src.app import create_app
+from src.config import Config
+from src.database import db
+from src.services import refresh_jobs
+from src.utils import image_generator
+
+DEFAULT_SIZES = '250,10000,100000'
+
+# Filter values present in every synthetic dataset.
+REGION = 'Africa'
+CURRENCY = 'C01'
+SORTS = [None, 'gdp_desc', 'gdp_asc']
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of sorted ``samples``, in milliseconds."""
+    return round(samples[min(int(len(samples) * p), len(samples) - 1)] * 1000, 3)
+
+
+def summarize(samples, elapsed):
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'per_second': round(len(samples) / elapsed, 2),
+        'p50_ms': percentile(samples, 0.5),
+        'p99_ms': percentile(samples, 0.99),
+        'max_ms': percentile(samples, 1.0),
+    }
+
+
+def listing_urls():
+    for region, currency, sort in itertools.product([None, REGION], [None, CURRENCY], SORTS):
+        params = {k: v for k, v in (('region', region), ('currency', currency), ('sort', sort)) if v}
+        yield f'/countries?{urlencode(params)}' if params else '/countries'
+
+
+def measure_gets(client, urls, args):
+    """Time GETs of ``urls`` in turn, within the request and time budget.
+
+    At least ``--min-requests`` are made even past ``--seconds``, so large
+    listings still get a percentile from more than one sample.
+    """
+    urls = itertools.cycle(urls)
+    client.get(next(urls)).get_data()  # warm-up, not counted
+
+    samples, body_bytes = [], 0
+    start = time.perf_counter()
+    while len(samples) < args.requests:
+        if len(samples) >= args.min_requests and time.perf_counter() - start >= args.seconds:
+            break
+        url = next(urls)
+        began = time.perf_counter()
+        response = client.get(url)
+        body = response.get_data()
+        samples.append(time.perf_counter() - began)
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {url} returned {response.status_code}')
+        body_bytes += len(body)
+
+    result = summarize(samples, time.perf_counter() - start)
+    result['mean_body_bytes'] = body_bytes // len(samples)
+    return result
+
+
+def refresh_once(app, client):
+    """POST /countries/refresh and wait for the job; returns (seconds, result)."""
+    began = time.perf_counter()
+    job_id = client.post('/countries/refresh').get_json()['job_id']
+    with app.app_context():
+        job = refresh_jobs.wait_for(job_id)
+    seconds = time.perf_counter() - began
+    if job.status != 'succeeded':
+        raise RuntimeError(f'Refresh failed: {job.error}')
+    return seconds, job.result
+
+
+def measure_refreshes(app, client, change, runs):
+    samples, rows = [], 0
+    for _ in range(runs):
+        change()
+        seconds, result = refresh_once(app, client)
+        samples.append(seconds)
+        rows += result['changed_countries']
+
+    result = summarize(samples, sum(samples))
+    result['changed_rows_per_second'] = round(rows / sum(samples), 1)
+    return result
+
+
+def bump_populations(countries):
+    for country in countries:
+        country['population'] += 1
+
+
+def bump_rates(rates):
+    for code in rates:
+        rates[code] = round(rates[code] * 1.001, 6)
+
+
+def bench_size(size, tmp, args):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, f'countries-{size}.db')}"
+        RESPONSE_CACHE_BYTES = Config.RESPONSE_CACHE_BYTES if args.cache else 0
+
+    app = create_app(BenchConfig())
+    client = app.test_client()
+    countries = make_countries(size)
+    results = []
+
+    def record(name, result):
+        results.append({'size': size, 'name': name, **result})
+        print(f"{size:>7,}  {name:<56} {result['per_second']:>9.1f}/s "
+              f"{result['p50_ms']:>10.2f}ms {result['p99_ms']:>10.2f}ms", flush=True)
+
+    with app.app_context():
+        db.create_all()
+
+    with StubUpstream(countries) as upstream:
+        seconds, _ = refresh_once(app, client)
+        record('POST /countries/refresh (initial)', summarize([seconds], seconds))
+
+        for url in listing_urls():
+            record(f'GET {url}', measure_gets(client, [url], args))
+        names = [f"/countries/{c['name']}" for c in countries[:: max(size // 500, 1)]]
+        record('GET /countries/<name>', measure_gets(client, names, args))
+        record('GET /status', measure_gets(client, ['/status'], args))
+
+        runs = args.refresh_runs
+        rates = upstream.rates['rates']
+        record('POST /countries/refresh (unchanged)', measure_refreshes(app, client, lambda: None, runs))
+        record('POST /countries/refresh (countries changed)',
+               measure_refreshes(app, client, lambda: bump_populations(countries), runs))
+        record('POST /countries/refresh (rates changed)', measure_refreshes(app, client, lambda: bump_rates(rates), runs))
+
+    with app.app_context():
+        db.engine.dispose()
+    return results
+
+
+def git_commit():
+    """(commit, dirty) of the working tree, or (None, None) outside git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True)
+        status = subprocess.run(['git', 'status', '--porcelain', '--', '.'],
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit.stdout.strip(), bool(status.stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated country counts')
+    parser.add_argument('--requests', type=int, default=500, help='most requests per GET case')
+    parser.add_argument('--min-requests', type=int, default=5, help='fewest requests per GET case')
+    parser.add_argument('--seconds', type=float, default=2.0, help='time budget per GET case')
+    parser.add_argument('--refresh-runs', type=int, default=3, help='refreshes per refresh case')
+    parser.add_argument('--cache', action='store_true', help='keep the response cache enabled')
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    commit, dirty = git_commit()
+    started_at = datetime.now(timezone.utc).isoformat()
+    print(f"{'size':>7}  {'case':<56} {'throughput':>11} {'p50':>12} {'p99':>12}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Summary images go to the temporary directory, not src/cache.
+        image_generator.CACHE_DIR = tmp
+        for size in sizes:
+            results.extend(bench_size(size, tmp, args))
+
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'started_at': started_at,
+        'python': sys.version.split()[0],
+        'sqlalchemy': sqlalchemy.__version__,
+        'platform': platform.platform(),
+        'args': vars(args),
+        'results': results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Upstream fetch latency: sequential requests.get versus fetch_sources.
+
+Both upstreams are local stub servers that delay every response, standing
+in for restcountries and the exchange-rate API.
+
+Run from the stage2 directory:
+
+    python -m benchmarks.bench_fetch --latency 0.25
+"""
+import argparse
+import time
+
+import requests
+
+from benchmarks.stub_upstream import StubUpstream, make_countries
+from src.services import refresh_service
+
+
+def sequential_fetch(timeout_seconds):
+    """The two back-to-back requests refresh_all used to make."""
+    countries = requests.get(refresh_service.COUNTRIES_API, timeout=timeout_seconds).json()
+    rates = requests.get(refresh_service.RATES_API, timeout=timeout_seconds).json()
+    return countries, rates.get('rates', {})
+
+
+def best_of(fn, rounds):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(30)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.25)
+    parser.add_argument('--countries', type=int, default=250)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with StubUpstream(make_countries(args.countries), latency=args.latency):
+        sequential = best_of(sequential_fetch, args.rounds)
+        concurrent = best_of(refresh_service.fetch_sources, args.rounds)
+
+    print(f'{args.latency * 1000:.0f} ms upstream latency, {args.countries:,} countries')
+    print(f'sequential requests.get  {sequential * 1000:8.1f} ms')
+    print(f'fetch_sources            {concurrent * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""GDP recompute at scale: per-row ORM loop versus the column pass.
+
+Seeds a local SQLite database with synthetic countries, changes every
+exchange rate, and times re-rating all rows with the loop refresh_all
+used before (load Country objects, one compute_estimated_gdp call and
+attribute write per row, flush) against ``recompute_gdp``. The arithmetic
+alone is also timed on in-memory columns.
+
+Run from the stage2 directory:
+
+    python -m benchmarks.bench_gdp --countries 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.stub_upstream import CURRENCIES, StubUpstream, make_countries, make_rates
+from src.app import create_app
+from src.config import Config
+from src.database import db
+from src.models import Country
+from src.services import refresh_service
+
+SEED = 'bench'
+
+
+def legacy_recompute(session, rates):
+    """Per-row re-rating over ORM objects, as the refresh loop did."""
+    now = datetime.now()
+    for country in session.query(Country).filter(Country.currency_code.is_not(None)):
+        country.exchange_rate = rates.get(country.currency_code)
+        country.estimated_gdp = refresh_service.compute_estimated_gdp(country.population, country.exchange_rate)
+        country.last_refreshed_at = now
+    session.commit()
+
+
+def scalar_gdp(populations, codes, rates):
+    return [refresh_service.compute_estimated_gdp(p, rates.get(c)) for p, c in zip(populations, codes)]
+
+
+def column_gdp(populations, codes, keys, rates):
+    new_rates = list(map(rates.get, codes))
+    multipliers = [refresh_service.gdp_multiplier(k, SEED) for k in keys]
+    return [None if r is None else p * m / r for p, r, m in zip(populations, new_rates, multipliers)]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--countries', type=int, default=10000)
+    args = parser.parse_args()
+
+    refresh_service.generate_summary_image = lambda *a, **k: None
+    countries = make_countries(args.countries)
+    rate_sets = [make_rates(seed)['rates'] for seed in (1, 2, 3)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'gdp.db')}"
+            GDP_MULTIPLIER_SEED = SEED
+
+        app = create_app(BenchConfig())
+        with app.app_context(), StubUpstream(countries):
+            db.create_all()
+            refresh_service.refresh_all()
+            session = db.session()
+
+            legacy = timed(legacy_recompute, session, rate_sets[0])
+            session.expunge_all()
+            column = timed(lambda: (refresh_service.recompute_gdp(session, rate_sets[1], datetime.now(), SEED),
+                                    session.commit()))
+
+            rows = session.query(Country.population, Country.currency_code, Country.name_normalized).all()
+            populations, codes, keys = zip(*rows)
+            scalar_math = timed(scalar_gdp, populations, codes, rate_sets[2])
+            column_math = timed(column_gdp, populations, codes, keys, rate_sets[2])
+
+    print(f'{args.countries:,} countries, {len(CURRENCIES)} currencies')
+    print(f"{'':<24} {'ORM loop':>10} {'column pass':>12}")
+    print(f"{'re-rate all rows':<24} {legacy:>9.3f}s {column:>11.3f}s")
+    print(f"{'GDP arithmetic only':<24} {scalar_math:>9.4f}s {column_math:>11.4f}s")
+
+
+if __name__ == '__main__':
+    main()
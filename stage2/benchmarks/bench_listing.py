@@ -0,0 +1,89 @@
+"""GET /countries throughput: ORM objects versus projected row tuples.
+
+Seeds a local SQLite database with synthetic countries and serves the
+listing through the Flask test client with the response cache disabled,
+comparing the original ``query.all()`` + per-row dict + ``jsonify`` path
+with the column projection, buffered and streamed.
+
+Run from the stage2 directory:
+
+    python -m benchmarks.bench_listing --countries 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from flask import jsonify
+
+from benchmarks.stub_upstream import StubUpstream, make_countries
+from src.app import create_app
+from src.config import Config
+from src.database import db
+from src.models import Country
+from src.services import refresh_service
+
+
+def orm_listing():
+    """The listing view as it was before the column projection."""
+    return jsonify([
+        {
+            "id": c.id,
+            "name": c.name,
+            "capital": c.capital,
+            "region": c.region,
+            "population": c.population,
+            "currency_code": c.currency_code,
+            "exchange_rate": c.exchange_rate,
+            "estimated_gdp": c.estimated_gdp,
+            "flag_url": c.flag_url,
+            "last_refreshed_at": c.last_refreshed_at.isoformat() if c.last_refreshed_at else None
+        }
+        for c in Country.query.order_by(Country.estimated_gdp.desc()).all()
+    ])
+
+
+def requests_per_second(client, url, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        response = client.get(url)
+        response.get_data()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--countries', type=int, default=5000)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    refresh_service.generate_summary_image = lambda *a, **k: None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'listing.db')}"
+            RESPONSE_CACHE_BYTES = 0
+
+        app = create_app(BenchConfig())
+        app.add_url_rule('/orm/countries', 'orm_listing', orm_listing)
+        with app.app_context():
+            db.create_all()
+            with StubUpstream(make_countries(args.countries)):
+                refresh_service.refresh_all()
+
+        client = app.test_client()
+        results = [
+            ('ORM objects + jsonify', requests_per_second(client, '/orm/countries', args.seconds)),
+            ('row tuples', requests_per_second(client, '/countries?sort=gdp_desc', args.seconds)),
+            ('row tuples, streamed', requests_per_second(client, '/countries?sort=gdp_desc&stream=true', args.seconds)),
+        ]
+
+    print(f'{args.countries:,} countries, response cache disabled')
+    for label, rps in results:
+        print(f'{label:<22} {rps:8.1f} req/s')
+
+
+if __name__ == '__main__':
+    main()
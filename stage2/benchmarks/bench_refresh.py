@@ -0,0 +1,119 @@
+"""Refresh wall time: per-country SELECT loop versus the preloaded map.
+
+Runs ``refresh_all`` against stub upstream APIs and a local SQLite
+database, once on an empty table (all inserts) and once more after
+changing every population (all updates), and compares it with the
+original loop that issued one ``SELECT ... WHERE lower(name) = ...``
+per country. Summary image generation is stubbed out so only the
+database work is compared.
+
+Run from the stage2 directory:
+
+    python -m benchmarks.bench_refresh --countries 250
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import func
+
+from benchmarks.stub_upstream import StubUpstream, make_countries
+from src.app import create_app
+from src.config import Config
+from src.database import db
+from src.models import Country
+from src.services import refresh_service
+
+
+def legacy_refresh(countries, rates):
+    """The per-country lookup loop ``refresh_all`` used before."""
+    now = datetime.now()
+    session = db.session()
+    for country in countries:
+        name = country.get('name')
+        currency_code = refresh_service.pick_currency_code(country.get('currencies'))
+        exchange_rate = rates.get(currency_code)
+        estimated_gdp = refresh_service.compute_estimated_gdp(country.get('population'), exchange_rate)
+
+        existing = session.query(Country).filter(
+            func.lower(Country.name) == name.lower()
+        ).one_or_none()
+
+        if existing:
+            existing.population = country.get('population')
+            existing.currency_code = currency_code
+            existing.exchange_rate = exchange_rate
+            existing.estimated_gdp = estimated_gdp
+            existing.last_refreshed_at = now
+            session.add(existing)
+        else:
+            session.add(Country(
+                name=name,
+                capital=country.get('capital'),
+                region=country.get('region'),
+                population=country.get('population'),
+                currency_code=currency_code,
+                exchange_rate=exchange_rate,
+                estimated_gdp=estimated_gdp,
+                flag_url=country.get('flag'),
+                last_refreshed_at=now,
+            ))
+    session.commit()
+
+
+def make_app(path):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig())
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def bump_populations(countries):
+    """Change every country so the next pass has rows to update."""
+    for country in countries:
+        country['population'] += 1
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--countries', type=int, default=250)
+    args = parser.parse_args()
+
+    countries = make_countries(args.countries)
+    refresh_service.generate_summary_image = lambda *a, **k: None
+
+    with tempfile.TemporaryDirectory() as tmp, StubUpstream(countries) as upstream:
+        legacy_app = make_app(os.path.join(tmp, 'legacy.db'))
+        with legacy_app.app_context():
+            rates = upstream.rates['rates']
+            legacy = []
+            for _ in range(2):
+                legacy.append(timed(legacy_refresh, countries, rates))
+                bump_populations(countries)
+
+        app = make_app(os.path.join(tmp, 'current.db'))
+        with app.app_context():
+            current = []
+            for _ in range(2):
+                current.append(timed(refresh_service.refresh_all))
+                bump_populations(countries)
+
+    print(f'{args.countries:,} countries')
+    print(f"{'':<18} {'insert pass':>12} {'update pass':>12}")
+    print(f"{'per-country SELECT':<18} {legacy[0]:>11.3f}s {legacy[1]:>11.3f}s")
+    print(f"{'preloaded map':<18} {current[0]:>11.3f}s {current[1]:>11.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Peak Python memory of a first refresh as the countries payload grows.
+
+Each country carries extra padding fields, standing in for a richer
+mirror of restcountries, and is served by the stub upstream. Peak
+allocations are traced during ``refresh_all`` against a fresh SQLite
+database; with the body parsed incrementally and written in batches the
+peak should stay close to flat while the payload grows.
+
+Run from the stage2 directory:
+
+    python -m benchmarks.bench_refresh_memory --sizes 1000 5000 20000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.stub_upstream import StubUpstream, make_countries
+from src.app import create_app
+from src.config import Config
+from src.database import db
+from src.services import refresh_service
+
+
+def rich_countries(count):
+    countries = make_countries(count)
+    for country in countries:
+        country['subdivisions'] = [{'code': f'S{i}', 'name': f'Subdivision {i}'} for i in range(20)]
+    return countries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    args = parser.parse_args()
+
+    refresh_service.generate_summary_image = lambda *a, **k: None
+
+    print(f"{'countries':>10} {'payload':>10} {'peak':>10} {'time':>8}")
+    for size in args.sizes:
+        # Encoded up front so the stub's own serialization is not traced.
+        body = json.dumps(rich_countries(size)).encode()
+        payload_mb = len(body) / 2**20
+
+        with tempfile.TemporaryDirectory() as tmp, StubUpstream(body):
+            class BenchConfig(Config):
+                SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'memory.db')}"
+
+            app = create_app(BenchConfig())
+            with app.app_context():
+                db.create_all()
+                tracemalloc.start()
+                start = time.perf_counter()
+                refresh_service.refresh_all()
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+
+        print(f'{size:>10,} {payload_mb:>8.1f}MB {peak:>8.1f}MB {elapsed:>7.2f}s')
+
+
+if __name__ == '__main__':
+    main()
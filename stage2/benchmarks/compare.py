@@ -0,0 +1,64 @@
+"""Compare two ``bench_api`` result files and flag regressions.
+
+Cases are matched by dataset size and name. A case regresses when its p50
+or p99 latency in the head run exceeds the base run by more than
+``--threshold`` (a fraction); the exit status is 1 if any case did, so the
+comparison can gate a CI job.
+
+Run from the stage2 directory:
+
+    python -m benchmarks.compare bench-results/base.json bench-results/head.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p99_ms')
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {(r['size'], r['name']): r for r in report['results']}
+
+
+def change(base, head):
+    return (head - base) / base if base else 0.0
+
+
+def label(report):
+    commit = (report.get('commit') or 'unknown')[:10]
+    return f"{commit}{' (dirty)' if report.get('dirty') else ''}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown, e.g. 0.10 for 10%%')
+    args = parser.parse_args()
+
+    base_report, base = load(args.base)
+    head_report, head = load(args.head)
+
+    print(f'base {label(base_report)}  head {label(head_report)}  threshold {args.threshold:.0%}')
+    print(f"{'size':>7}  {'case':<56} {'p50 base':>10} {'p50 head':>10} {'p50':>7} {'p99':>7}")
+
+    regressions = 0
+    for key in sorted(base.keys() & head.keys()):
+        old, new = base[key], head[key]
+        deltas = {metric: change(old[metric], new[metric]) for metric in METRICS}
+        regressed = any(delta > args.threshold for delta in deltas.values())
+        regressions += regressed
+        print(f"{key[0]:>7,}  {key[1]:<56} {old['p50_ms']:>8.2f}ms {new['p50_ms']:>8.2f}ms "
+              f"{deltas['p50_ms']:>+7.0%} {deltas['p99_ms']:>+7.0%}{'  REGRESSED' if regressed else ''}")
+
+    for key in sorted(base.keys() ^ head.keys()):
+        print(f"{key[0]:>7,}  {key[1]:<56} only in {'base' if key in base else 'head'}")
+
+    print(f'{regressions} regression(s)')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
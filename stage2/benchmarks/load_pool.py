@@ -0,0 +1,113 @@
+"""Request latency under concurrency for different connection pool sizes.
+
+Serves the app with a threaded Werkzeug server over a seeded SQLite
+database, adds a fixed delay to every query to stand in for a network
+round trip to MySQL, and drives GET /countries/<name> from concurrent
+clients. Reports client p50/p99 latency and the pool checkout wait and
+saturation that /status exposes.
+
+Run from the stage2 directory:
+
+    python -m benchmarks.load_pool --clients 16 --requests 800
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from sqlalchemy import event
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from benchmarks.stub_upstream import StubUpstream, make_countries
+from src.app import create_app
+from src.config import Config
+from src.database import db
+from src.services import refresh_service
+
+# (label, pool size, max overflow)
+POOLS = [
+    ('1 + 0 overflow', 1, 0),
+    ('5 + 10 overflow', Config.DB_POOL_SIZE, Config.DB_MAX_OVERFLOW),
+    ('16 + 0 overflow', 16, 0),
+]
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def run(path, names, pool_size, max_overflow, args):
+    class LoadConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        DB_POOL_SIZE = pool_size
+        DB_MAX_OVERFLOW = max_overflow
+
+    app = create_app(LoadConfig())
+    with app.app_context():
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def round_trip(*_):
+            time.sleep(args.query_latency / 1000)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    local = threading.local()
+
+    def hit(i):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        local.session.get(f'{base}/countries/{names[i % len(names)]}').raise_for_status()
+        return time.perf_counter() - start
+
+    try:
+        with ThreadPoolExecutor(args.clients) as clients:
+            latencies = sorted(clients.map(hit, range(args.requests)))
+        pool = requests.get(f'{base}/status').json()['db_pool']
+    finally:
+        server.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+
+    def pct(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+    return pct(0.5), pct(0.99), pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=800)
+    parser.add_argument('--query-latency', type=float, default=2.0, help='ms added to every query')
+    args = parser.parse_args()
+
+    refresh_service.generate_summary_image = lambda *a, **k: None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'load.db')
+        countries = make_countries(250)
+
+        class SeedConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+        with create_app(SeedConfig()).app_context(), StubUpstream(countries):
+            db.create_all()
+            refresh_service.refresh_all()
+
+        names = [c['name'] for c in countries]
+        results = [(label, *run(path, names, size, overflow, args)) for label, size, overflow in POOLS]
+
+    print(f'{args.clients} clients, {args.requests} requests, {args.query_latency:g} ms per query')
+    print(f"{'pool':<16} {'p50':>8} {'p99':>8} {'wait p99':>9} {'peak use':>9} {'timeouts':>9}")
+    for label, p50, p99, pool in results:
+        print(f"{label:<16} {p50:7.1f}ms {p99:7.1f}ms {pool['checkout_wait_ms']['p99']:8.1f}ms "
+              f"{pool['peak_in_use']:>9} {pool['timeouts']:>9}")
+
+
+if __name__ == '__main__':
+    main()
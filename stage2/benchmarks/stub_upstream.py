@@ -0,0 +1,126 @@
+"""Local stand-ins for the restcountries and exchange-rate APIs.
+
+Serves a synthetic dataset over HTTP from a background thread, optionally
+delaying every response, and points ``refresh_service`` at it:
+
+    with StubUpstream(make_countries(250), latency=0.2) as upstream:
+        refresh_all()
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.services import refresh_service
+
+REGIONS = ['Africa', 'Americas', 'Asia', 'Europe', 'Oceania', 'Polar']
+CURRENCIES = [f'C{i:02d}' for i in range(160)]
+
+
+def make_countries(count, seed=0):
+    """Synthetic restcountries-style payload with ``count`` countries."""
+    rng = random.Random(seed)
+    countries = []
+    for i in range(count):
+        country = {
+            'name': f'Country {i:06d}',
+            'capital': f'Capital {i}',
+            'region': rng.choice(REGIONS),
+            'population': rng.randint(10_000, 200_000_000),
+            'flag': f'https://flags.example/{i}.svg',
+            'currencies': [{'code': rng.choice(CURRENCIES), 'name': 'Currency', 'symbol': '$'}],
+        }
+        if i % 50 == 0:
+            country['currencies'] = []
+        countries.append(country)
+    return countries
+
+
+def make_rates(seed=0):
+    """Rates for all but a few of the synthetic currencies."""
+    rng = random.Random(seed)
+    return {
+        'result': 'success',
+        'base_code': 'USD',
+        'rates': {code: round(rng.uniform(0.1, 2000), 4) for code in CURRENCIES[:-5]},
+    }
+
+
+class StubUpstream:
+    """HTTP server for ``/countries`` and ``/rates``; a context manager.
+
+    Responses are HTTP/1.1 with keep-alive, and ``connections`` records the
+    client sockets seen so connection reuse can be checked. Each body carries
+    an ``ETag`` and ``If-None-Match`` is answered with 304 unless
+    ``conditional`` is turned off.
+    """
+
+    def __init__(self, countries, rates=None, latency=0.0):
+        self.countries = countries
+        self.rates = rates if rates is not None else make_rates()
+        self.latency = latency
+        self.requests = []
+        self.connections = set()
+        self.conditional = True
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._saved = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def _handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                upstream.requests.append((self.path, dict(self.headers)))
+                upstream.connections.add(self.client_address)
+                if upstream.latency:
+                    time.sleep(upstream.latency)
+                if self.path.startswith('/countries'):
+                    payload = upstream.countries
+                elif self.path.startswith('/rates'):
+                    payload = upstream.rates
+                else:
+                    self.send_error(404)
+                    return
+                # Pre-encoded payloads are served as they are.
+                body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if upstream.conditional and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if upstream.conditional:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        self._saved = (refresh_service.COUNTRIES_API, refresh_service.RATES_API)
+        refresh_service.COUNTRIES_API = f'{self.base_url}/countries'
+        refresh_service.RATES_API = f'{self.base_url}/rates'
+        return self
+
+    def __exit__(self, *exc):
+        refresh_service.COUNTRIES_API, refresh_service.RATES_API = self._saved
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,10 +1,47 @@
 import os
-from flask import Flask, request, jsonify, send_file
+import time
+from datetime import datetime
+import click
+from flask import Flask, Response, g, request, jsonify, stream_with_context, url_for
 from sqlalchemy import func
 from .config import Config
-from .database import db
-from .models import Country, Meta
-from .services.refresh_service import refresh_all, ExternalAPIError
+from .database import db, pool_metrics
+from .migrations import MigrationError, upgrade
+from .models import Country, Meta, normalize_name
+from .services.country_listing import (
+    GROUP_BY_FIELDS, LIST_FIELDS, MAX_LIMIT, listing_json, listing_statement, stats, stream_listing_json,
+)
+from .services.rate_history import BUCKET_FORMATS, rate_history
+from .services.refresh_jobs import UPSTREAM_UNAVAILABLE, submit_refresh, get_job, wait_for
+from .services.refresh_service import bump_generation, current_generation, forget_sources, get_meta
+from .utils.image_generator import IMAGE_FORMATS, load_summary_image
+from .utils.metrics import CONTENT_TYPE, REGISTRY
+from .utils.response_cache import ResponseCache
+
+# Cache lifetime for content-addressed summary images.
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# How long POST /countries/recompute waits for its job before answering 202.
+RECOMPUTE_WAIT_SECONDS = 60
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Request latency by route pattern and status.',
+    ['method', 'route', 'status'])
+DB_POOL = REGISTRY.gauge('db_pool_connections', 'Database pool connections by state.', ['state'])
+
+def _int_arg(name, default, low, high=None):
+    """Integer query arg in ``[low, high]``; ValueError with a message otherwise."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = None
+    if number is None or number < low or (high is not None and number > high):
+        bounds = f'between {low} and {high}' if high is not None else f'at least {low}'
+        raise ValueError(f'{name} must be an integer {bounds}')
+    return number
 
 def create_app(config: Config):
     """Factory function to create and configure the Flask app."""
@@ -13,45 +50,133 @@ def create_app(config: Config):
 
     db.init_app(app)
 
+    response_cache = ResponseCache(app.config.get('RESPONSE_CACHE_BYTES', Config.RESPONSE_CACHE_BYTES))
+    app.extensions['response_cache'] = response_cache
+
+    def cached_json(key, build):
+        """Serve ``build()`` as JSON from ``response_cache`` with an ETag.
+
+        ``build`` runs only on a miss and returns either the body or its
+        already serialized bytes; a matching If-None-Match gets a 304.
+        Returns None, caching nothing, when ``build`` returns None.
+        """
+        generation = current_generation(db.session)
+        entry = response_cache.get(key, generation)
+        if entry is None:
+            body = build()
+            if body is None:
+                return None
+            if not isinstance(body, bytes):
+                body = (app.json.dumps(body) + '\n').encode()
+            entry = response_cache.put(key, generation, body)
+
+        if request.if_none_match.contains(entry.etag):
+            response = Response(status=304)
+        else:
+            response = Response(entry.body, status=200, mimetype='application/json')
+        response.set_etag(entry.etag)
+        return response
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_latency(response):
+        # Labelled by route pattern, not path, so names and digests don't fan out.
+        # A streamed body is still being sent, so its time here is time to first byte.
+        if 'request_started' in g:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - g.request_started, method=request.method,
+                route=request.url_rule.rule if request.url_rule else 'unmatched',
+                status=response.status_code)
+        return response
+
     if os.getenv("RUN_MAIN") == "true":
         with app.app_context():
             try:
-                db.create_all()
+                upgrade()
                 print("Database tables created successfully.")
             except Exception as e:
                 pass
                 print(f"Skipped table creation due to: {e}")
 
+    @app.cli.group('db')
+    def db_cli():
+        """Database schema commands."""
+
+    @db_cli.command('upgrade')
+    def db_upgrade():
+        """Add any missing tables, columns and indexes."""
+        try:
+            steps = upgrade()
+        except MigrationError as e:
+            raise click.ClickException(str(e))
+        for step in steps or ['schema already up to date']:
+            print(step)
+
     @app.route('/')
     def home():
         return "Welcome to Countries Currency Exchange App"
 
     @app.route('/countries/refresh', methods=['POST'])
     def refresh():
-        try:
-            result = refresh_all(timeout_seconds=Config.REFRESH_TIMEOUT_SECONDS)
+        # The refresh runs in the background; concurrent calls join it.
+        profile = request.args.get('profile', '').lower() == 'true'
+        job, _ = submit_refresh(app, timeout_seconds=Config.REFRESH_TIMEOUT_SECONDS, profile=profile)
+        status_url = url_for('refresh_status', job_id=job.id)
 
-            if isinstance(result, tuple):
-                data, status = result
-            else:
-                data, status = result, 200
+        return jsonify({
+            'message': 'Refresh Accepted',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': status_url,
+        }), 202, {'Location': status_url}
 
-            if "error" in data:
-                return jsonify(data), status
+    @app.route('/countries/recompute', methods=['POST'])
+    def recompute():
+        # Rates only, so quick: answer with the result. It still runs on the
+        # refresh job runner, so it never overlaps a refresh.
+        job, _ = submit_refresh(app, timeout_seconds=Config.REFRESH_TIMEOUT_SECONDS, kind='recompute')
+        status_url = url_for('refresh_status', job_id=job.id)
 
+        finished = wait_for(job.id, RECOMPUTE_WAIT_SECONDS)
+        if finished is None:
             return jsonify({
-                'message': 'Refresh Completed',
-                'total_countries': data['total'],
-                'last_refreshed_at': data['last_refreshed_at'],
-            })
-        except ExternalAPIError as e:
-            return jsonify({
-                'error': 'External data source unavailable',
-                'details': str(e)}
-            ), 503
-        except Exception as e:
-            app.logger.exception('Refresh failed')
-            return jsonify({'error': f'Internal server error: {e}'}), 500
+                'message': 'Recompute Accepted',
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': status_url,
+            }), 202, {'Location': status_url}
+
+        if finished.error:
+            return jsonify(finished.error), 503 if finished.error['error'] == UPSTREAM_UNAVAILABLE else 500
+
+        return jsonify({
+            'message': 'Recompute Completed',
+            'job_id': finished.id,
+            'total_countries': finished.result['total_countries'],
+            'changed_countries': finished.result['changed_countries'],
+            'last_refreshed_at': finished.result['last_refreshed_at'],
+        })
+
+    @app.route('/countries/refresh/<job_id>', methods=['GET'])
+    def refresh_status(job_id):
+        job = get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Refresh job not found'}), 404
+
+        return jsonify(job.to_dict())
+
+    @app.route('/countries/refresh/<job_id>/profile', methods=['GET'])
+    def refresh_profile(job_id):
+        """Raw cProfile stats of a profiled job, for pstats or snakeviz."""
+        job = get_job(job_id)
+        if not job or job.profile_stats is None:
+            return jsonify({'error': 'Refresh profile not found'}), 404
+
+        return Response(job.profile_stats, mimetype='application/octet-stream',
+                        headers={'Content-Disposition': f'attachment; filename=refresh-{job.id}.prof'})
 
     @app.route('/countries', methods=['GET'])
     def countries():
@@ -59,70 +184,122 @@ def create_app(config: Config):
         currency = request.args.get('currency')
         sort = request.args.get('sort')
 
-        query = Country.query
-
-        if region:
-            query = query.filter(Country.region == region)
-        if currency:
-            query = query.filter(Country.currency_code == currency)
-
-        if sort == 'gdp_desc':
-            query = query.order_by(Country.estimated_gdp.desc())
-        elif sort == 'gdp_asc':
-            query = query.order_by(Country.estimated_gdp.asc())
-
-        all_countries = query.all()
-
-        return jsonify([
-            {
-                "id": c.id,
-                "name": c.name,
-                "capital": c.capital,
-                "region": c.region,
-                "population": c.population,
-                "currency_code": c.currency_code,
-                "exchange_rate": c.exchange_rate,
-                "estimated_gdp": c.estimated_gdp,
-                "flag_url": c.flag_url,
-                "last_refreshed_at": c.last_refreshed_at.isoformat() if c.last_refreshed_at else None
-            }
-            for c in all_countries
-        ])
+        fields = LIST_FIELDS
+        if request.args.get('fields'):
+            fields = tuple(f.strip() for f in request.args['fields'].split(',') if f.strip())
+            unknown = [f for f in fields if f not in LIST_FIELDS]
+            if unknown or not fields:
+                return jsonify({'error': f'Unknown fields: {", ".join(unknown)}'}), 400
+
+        try:
+            limit = _int_arg('limit', None, 1, MAX_LIMIT)
+            offset = _int_arg('offset', 0, 0)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        stmt = listing_statement(region, currency, sort, fields, limit, offset)
+
+        # Streamed responses go straight from the cursor, bypassing the cache.
+        if request.args.get('stream', '').lower() == 'true':
+            return Response(stream_with_context(stream_listing_json(stmt)), mimetype='application/json')
+
+        key = ('countries', region, currency, sort, fields, limit, offset)
+        return cached_json(key, lambda: listing_json(stmt))
+
+    @app.route('/countries/stats', methods=['GET'])
+    def country_stats():
+        group_by = request.args.get('group_by') or None
+        if group_by is not None and group_by not in GROUP_BY_FIELDS:
+            return jsonify({'error': f'group_by must be one of: {", ".join(GROUP_BY_FIELDS)}'}), 400
+
+        return cached_json(('stats', group_by), lambda: stats(group_by))
 
     @app.route('/countries/<name>', methods=['GET'])
     def get_country(name):
-        country = Country.query.filter(Country.name.ilike(name)).first()
-        if not country:
+        key = normalize_name(name)
+
+        def build():
+            country = Country.query.filter_by(name_normalized=key).first()
+            if not country:
+                return None
+
+            return {
+                'id': country.id,
+                'name': country.name,
+                'capital': country.capital,
+                'region': country.region,
+                'currency_code': country.currency_code,
+                'exchange_rate': country.exchange_rate,
+                'estimated_gdp': country.estimated_gdp,
+                'flag_url': country.flag_url,
+                'last_refreshed_at': country.last_refreshed_at,
+            }
+
+        response = cached_json(('country', key), build)
+        if response is None:
             return jsonify({'error': 'Country not found'}), 404
+        return response
 
-        return jsonify({
-            'id': country.id,
-            'name': country.name,
-            'capital': country.capital,
-            'region': country.region,
-            'currency_code': country.currency_code,
-            'exchange_rate': country.exchange_rate,
-            'estimated_gdp': country.estimated_gdp,
-            'flag_url': country.flag_url,
-            'last_refreshed_at': country.last_refreshed_at,
-        })
+    def image_response(digest, fmt, max_age):
+        data = load_summary_image(digest, fmt)
+        if data is None:
+            return jsonify({'error': 'Summary image not found'}), 404
+
+        response = Response(data, mimetype=IMAGE_FORMATS[fmt])
+        response.set_etag(f'{digest}.{fmt}')
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.vary.add('Accept')
+        response.headers['Content-Location'] = url_for('summary_image', digest=digest, fmt=fmt)
+        return response.make_conditional(request)
 
     @app.route('/countries/image', methods=['GET'])
     def country_image():
-        try:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            file_path = os.path.join(base_dir, 'cache', 'summary.png')
-            file_path = os.path.abspath(file_path)
+        """The current summary, revalidated by ETag on every use."""
+        digest = get_meta(db.session, 'summary_image')
+        if not digest:
+            return jsonify({'error': 'Summary image not found'}), 404
 
-            if not os.path.exists(file_path):
-                return jsonify({
-                    'error': 'Summary image not found'
-                }), 404
+        # WebP only when asked for by name; */* clients keep getting PNG.
+        fmt = request.args.get('format')
+        if fmt is None:
+            fmt = 'webp' if 'image/webp' in request.accept_mimetypes.values() else 'png'
+        if fmt not in IMAGE_FORMATS:
+            return jsonify({'error': f'format must be one of: {", ".join(IMAGE_FORMATS)}'}), 400
 
-            return send_file(file_path, mimetype='image/png', max_age=0)
-        except Exception as e:
-            app.logger.error(f"Error sending image: {e}")
-            return jsonify({'error': 'Could not send image'}), 500
+        return image_response(digest, fmt, max_age=0)
+
+    @app.route('/countries/image/<digest>.<fmt>', methods=['GET'])
+    def summary_image(digest, fmt):
+        """A summary by content digest; it never changes, so cache it for a year."""
+        if fmt not in IMAGE_FORMATS:
+            return jsonify({'error': 'Summary image not found'}), 404
+
+        response = image_response(digest, fmt, max_age=IMMUTABLE_MAX_AGE)
+        if isinstance(response, Response):
+            response.cache_control.immutable = True
+        return response
+
+    @app.route('/currencies/<code>/history', methods=['GET'])
+    def currency_history(code):
+        code = code.upper()
+        bucket = request.args.get('bucket') or None
+        if bucket is not None and bucket not in BUCKET_FORMATS:
+            return jsonify({'error': f'bucket must be one of: {", ".join(BUCKET_FORMATS)}'}), 400
+
+        bounds = {}
+        for arg in ('from', 'to'):
+            value = request.args.get(arg)
+            try:
+                bounds[arg] = datetime.fromisoformat(value) if value else None
+            except ValueError:
+                return jsonify({'error': f'{arg} must be an ISO 8601 date or datetime'}), 400
+
+        return jsonify({
+            'currency_code': code,
+            'bucket': bucket,
+            'points': rate_history(db.session, code, bounds['from'], bounds['to'], bucket),
+        })
 
     @app.route('/status', methods=['GET'])
     def status():
@@ -135,21 +312,31 @@ def create_app(config: Config):
 
         return jsonify({
             "total_countries": total_countries,
-            "last_refreshed_at": last_refresh.isoformat() + "Z" if last_refresh else None
+            "last_refreshed_at": last_refresh.isoformat() + "Z" if last_refresh else None,
+            "db_pool": pool_metrics(db.engine),
         })
 
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        pool = pool_metrics(db.engine)
+        if pool:
+            for state in ('in_use', 'idle', 'overflow'):
+                DB_POOL.set(pool[state], state=state)
+
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
     @app.route('/countries/<string:name>', methods=['DELETE'])
     def delete_country(name):
         # Case-insensitive match
-        country = Country.query.filter(
-            func.lower(Country.name) == name.lower()
-        ).first()
+        country = Country.query.filter_by(name_normalized=normalize_name(name)).first()
 
         if not country:
             return jsonify({"error": f'Country "{name}" not found'}), 404
 
         try:
             db.session.delete(country)
+            forget_sources(db.session)
+            bump_generation(db.session)
             db.session.commit()
             return jsonify({"message": f"{country.name} removed successfully"}), 200
         except Exception as e:
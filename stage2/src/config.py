@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
 
+from .database import engine_options
+
 load_dotenv()
 
 class Config:
@@ -12,4 +14,30 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "mysql+pymysql://hng13:stage2@db:3306/country_currency_exchange")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool, per worker process. Recycle below MySQL's idle
+    # wait_timeout and pre-ping so stale connections are replaced, not used.
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 280))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+
+    @property
+    def SQLALCHEMY_ENGINE_OPTIONS(self):
+        return engine_options(
+            self.SQLALCHEMY_DATABASE_URI,
+            pool_size=self.DB_POOL_SIZE,
+            max_overflow=self.DB_MAX_OVERFLOW,
+            pool_recycle=self.DB_POOL_RECYCLE,
+            pool_pre_ping=self.DB_POOL_PRE_PING,
+            pool_timeout=self.DB_POOL_TIMEOUT,
+        )
+
     REFRESH_TIMEOUT_SECONDS = int(os.environ.get("REFRESH_TIMEOUT_SECONDS", 30))
+
+    # Seeds the per-country GDP multiplier so estimates are reproducible;
+    # set it empty to draw a fresh random multiplier on every write instead.
+    GDP_MULTIPLIER_SEED = os.environ.get("GDP_MULTIPLIER_SEED", "countries")
+
+    # Serialized /countries and /countries/<name> bodies held per worker.
+    RESPONSE_CACHE_BYTES = int(os.environ.get("RESPONSE_CACHE_BYTES", 8 * 1024 * 1024))
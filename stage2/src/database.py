@@ -1,3 +1,97 @@
+import threading
+import time
+from collections import deque
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 
 db = SQLAlchemy()
+
+# Checkout waits kept for the latency percentiles on /status.
+WAIT_SAMPLES = 1024
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._checkouts = 0
+        self._timeouts = 0
+        self._peak_in_use = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+            in_use = self.checkedout()
+            with self._metrics_lock:
+                self._peak_in_use = max(self._peak_in_use, in_use)
+            return connection
+        except PoolTimeoutError:
+            with self._metrics_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._metrics_lock:
+                self._waits.append(waited)
+                self._checkouts += 1
+
+    def recreate(self):
+        # Keep counting across the recreate done on invalidation.
+        pool = super().recreate()
+        pool._waits, pool._checkouts, pool._timeouts = self._waits, self._checkouts, self._timeouts
+        pool._peak_in_use = self._peak_in_use
+        return pool
+
+    def metrics(self):
+        with self._metrics_lock:
+            waits = sorted(self._waits)
+            checkouts, timeouts, peak = self._checkouts, self._timeouts, self._peak_in_use
+
+        def percentile(p):
+            return round(waits[min(int(len(waits) * p), len(waits) - 1)] * 1000, 3) if waits else None
+
+        return {
+            'size': self.size(),
+            'in_use': self.checkedout(),
+            'peak_in_use': peak,
+            'idle': self.checkedin(),
+            'overflow': max(self.overflow(), 0),
+            'max_overflow': self._max_overflow,
+            'checkouts': checkouts,
+            'timeouts': timeouts,
+            'checkout_wait_ms': {'p50': percentile(0.5), 'p99': percentile(0.99),
+                                 'max': percentile(1.0)},
+        }
+
+
+def engine_options(uri, pool_size, max_overflow, pool_recycle, pool_pre_ping, pool_timeout):
+    """Engine options for SQLALCHEMY_ENGINE_OPTIONS.
+
+    In-memory SQLite keeps the single shared connection Flask-SQLAlchemy
+    gives it, so pool sizing only applies to real databases.
+    """
+    url = make_url(uri)
+    if url.drivername.startswith('sqlite') and url.database in (None, '', ':memory:'):
+        return {}
+
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': pool_pre_ping,
+        'pool_timeout': pool_timeout,
+    }
+
+
+def pool_metrics(engine):
+    """Pool saturation and checkout latency, or None for untimed pools."""
+    pool = engine.pool
+    return pool.metrics() if isinstance(pool, TimedQueuePool) else None
@@ -0,0 +1,85 @@
+"""Bring an existing database up to the current models.
+
+``db.create_all`` only creates missing tables, so databases created before
+``countries.name_normalized`` and the listing indexes existed are upgraded
+here. Every step checks the live schema first, so this is safe to re-run:
+
+    flask db upgrade
+"""
+from sqlalchemy import inspect, text
+
+from .database import db
+from .models import Country, RateHistory, normalize_name
+
+
+class MigrationError(RuntimeError):
+    """The database holds data a step cannot migrate without an operator."""
+
+
+def _add_name_normalized(conn):
+    # Backfill in Python: SQL lower() is not a casefold, so names it kept
+    # apart ('Straße', 'STRASSE') can collide here. Those rows are real data;
+    # refuse to go on rather than pick one to delete. Checked before the
+    # ALTER, which MySQL and SQLite do not roll back.
+    groups = {}
+    for row_id, name in conn.execute(text('SELECT id, name FROM countries ORDER BY id')):
+        groups.setdefault(normalize_name(name), []).append((row_id, name))
+
+    conflicts = {key: rows for key, rows in groups.items() if len(rows) > 1}
+    if conflicts:
+        listing = '; '.join(
+            ', '.join(f'{row_id} {name!r}' for row_id, name in rows) for rows in conflicts.values())
+        raise MigrationError(
+            f'countries.name_normalized: country names collide once casefolded in {len(conflicts)} group(s) '
+            f'(id name: {listing}). Rename or delete all but one row in each group, then run '
+            f'flask db upgrade again.')
+
+    conn.execute(text('ALTER TABLE countries ADD COLUMN name_normalized VARCHAR(128)'))
+    conn.execute(
+        text('UPDATE countries SET name_normalized = :key WHERE id = :id'),
+        [{'key': key, 'id': rows[0][0]} for key, rows in groups.items()],
+    )
+
+
+def _widen_fetched_at(conn):
+    # rate_history tables created before fetched_at had fractional seconds.
+    column = next(c for c in inspect(conn).get_columns(RateHistory.__tablename__) if c['name'] == 'fetched_at')
+    if getattr(column['type'], 'fsp', None):
+        return False
+    conn.execute(text('ALTER TABLE rate_history MODIFY fetched_at DATETIME(6) NOT NULL'))
+    return True
+
+
+def upgrade(engine=None):
+    """Create missing tables, columns and indexes.
+
+    Returns:
+        list: Human-readable description of each step applied.
+
+    Raises:
+        MigrationError: If country names collide once casefolded.
+    """
+    engine = engine or db.engine
+    applied = []
+
+    with engine.begin() as conn:
+        if not inspect(conn).has_table(Country.__tablename__):
+            db.metadata.create_all(conn)
+            return ['created all tables']
+
+        db.metadata.create_all(conn)
+        columns = {c['name'] for c in inspect(conn).get_columns(Country.__tablename__)}
+        if 'name_normalized' not in columns:
+            _add_name_normalized(conn)
+            applied.append('added countries.name_normalized')
+
+        if conn.dialect.name == 'mysql' and _widen_fetched_at(conn):
+            applied.append('widened rate_history.fetched_at to microseconds')
+
+        existing = {i['name'] for i in inspect(conn).get_indexes(Country.__tablename__)}
+        for index in Country.__table__.indexes:
+            if index.name not in existing:
+                index.create(conn)
+                applied.append(f'created index {index.name}')
+
+    return applied
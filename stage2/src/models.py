@@ -1,12 +1,27 @@
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import validates
+
 from .database import db
 from datetime import datetime, timezone
 
 
+def normalize_name(name):
+    """Key used for every country name lookup: casefolded, outer spaces dropped."""
+    return name.strip().casefold()
+
+
 class Country(db.Model):
     __tablename__ = 'countries'
+    __table_args__ = (
+        # Serve /countries filters with the estimated_gdp sort in index order.
+        db.Index('ix_countries_region_currency_gdp', 'region', 'currency_code', 'estimated_gdp'),
+        db.Index('ix_countries_currency_gdp', 'currency_code', 'estimated_gdp'),
+        db.Index('ix_countries_gdp', 'estimated_gdp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False)
+    name_normalized = db.Column(db.String(128), nullable=False, unique=True, index=True)
     capital = db.Column(db.String(128))
     region = db.Column(db.String(64))
     population = db.Column(db.BigInteger)
@@ -16,8 +31,62 @@ class Country(db.Model):
     flag_url = db.Column(db.String(255))
     last_refreshed_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
 
+    @validates('name')
+    def _set_name_normalized(self, key, name):
+        self.name_normalized = normalize_name(name)
+        return name
+
 class Meta(db.Model):
     __tablename__ = 'meta'
 
     key = db.Column(db.String(100), primary_key=True)
     value = db.Column(db.Text)
+
+class RateHistory(db.Model):
+    """One USD exchange rate as fetched by a refresh; rows are never updated."""
+    __tablename__ = 'rate_history'
+    __table_args__ = (
+        # Covers range scans per currency without touching the table rows.
+        db.Index('ix_rate_history_code_time_rate', 'currency_code', 'fetched_at', 'rate'),
+    )
+
+    currency_code = db.Column(db.String(8), primary_key=True)
+    # Microseconds on MySQL, whose DATETIME drops them by default: two runs
+    # recording rates within one second must not collide on the key.
+    fetched_at = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'), primary_key=True)
+    rate = db.Column(db.Float, nullable=False)
+
+class RefreshJob(db.Model):
+    """A refresh or recompute job, kept in the database so every worker sees it."""
+    __tablename__ = 'refresh_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(16), nullable=False)
+    status = db.Column(db.String(16), nullable=False)
+    submitted_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    phases = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.JSON)
+    profile = db.Column(db.Text)
+    # cProfile dumps easily pass the 64 KB of a MySQL BLOB.
+    profile_stats = db.Column(db.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'))
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'submitted_at': self.submitted_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'phases': {name: round(seconds, 4) for name, seconds in (self.phases or {}).items()},
+            'result': self.result,
+            'error': self.error,
+            'profile': self.profile,
+        }
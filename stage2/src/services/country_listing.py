@@ -0,0 +1,125 @@
+import json
+
+from sqlalchemy import func, select
+
+from ..database import db
+from ..models import Country
+
+# Columns returned by GET /countries, in output order.
+LIST_FIELDS = (
+    'id', 'name', 'capital', 'region', 'population', 'currency_code',
+    'exchange_rate', 'estimated_gdp', 'flag_url', 'last_refreshed_at',
+)
+
+# Rows fetched from the cursor per round trip when streaming.
+STREAM_BATCH_SIZE = 500
+
+# Largest page GET /countries will return when ``limit`` is given.
+MAX_LIMIT = 1000
+
+# Columns /countries/stats can group by.
+GROUP_BY_FIELDS = ('region', 'currency_code')
+
+# The stdlib encoder runs in C when it has no indent or default hook, which
+# holds here since every column is a plain JSON value by the time it is
+# encoded.
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+def listing_statement(region=None, currency=None, sort=None, fields=LIST_FIELDS,
+                      limit=None, offset=0):
+    """SELECT of just ``fields``, filtered, sorted and paged like /countries.
+
+    Rows are ordered by id after any GDP sort, so limit/offset pages are
+    stable between requests.
+    """
+    stmt = select(*(getattr(Country, field) for field in fields))
+
+    if region:
+        stmt = stmt.where(Country.region == region)
+    if currency:
+        stmt = stmt.where(Country.currency_code == currency)
+
+    if sort == 'gdp_desc':
+        stmt = stmt.order_by(Country.estimated_gdp.desc())
+    elif sort == 'gdp_asc':
+        stmt = stmt.order_by(Country.estimated_gdp.asc())
+    stmt = stmt.order_by(Country.id)
+
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    if offset:
+        stmt = stmt.offset(offset)
+    return stmt
+
+def stats(group_by=None):
+    """Count, sum and average of population and GDP, computed by the database.
+
+    With ``group_by`` (one of GROUP_BY_FIELDS) there is one entry per
+    distinct value, largest total GDP first; without it, one entry overall.
+    """
+    aggregates = [
+        func.count(Country.id).label('count'),
+        func.sum(Country.population).label('population_sum'),
+        func.avg(Country.population).label('population_avg'),
+        func.sum(Country.estimated_gdp).label('gdp_sum'),
+        func.avg(Country.estimated_gdp).label('gdp_avg'),
+    ]
+    if group_by:
+        column = getattr(Country, group_by)
+        stmt = (select(column, *aggregates).group_by(column)
+                .order_by(func.sum(Country.estimated_gdp).desc(), column))
+    else:
+        stmt = select(*aggregates)
+
+    groups = []
+    for row in _execute(stmt).mappings():
+        group = {key: _number(value) for key, value in row.items() if key != group_by}
+        if group_by:
+            group = {group_by: row[group_by], **group}
+        groups.append(group)
+    return {'group_by': group_by, 'groups': groups}
+
+def _number(value):
+    # SUM/AVG come back as Decimal on MySQL.
+    if value is None or isinstance(value, int):
+        return value
+    return float(value)
+
+def _execute(stmt, **options):
+    # Core execution on the session's connection skips the ORM result layer.
+    return db.session.connection().execute(stmt, execution_options=options)
+
+def _dicts(rows, fields):
+    if 'last_refreshed_at' not in fields:
+        return [dict(zip(fields, row)) for row in rows]
+
+    stamp = fields.index('last_refreshed_at')
+    dicts = []
+    for row in rows:
+        row = list(row)
+        if row[stamp] is not None:
+            row[stamp] = row[stamp].isoformat()
+        dicts.append(dict(zip(fields, row)))
+    return dicts
+
+def listing_json(stmt):
+    """The whole listing as one JSON array, as bytes."""
+    result = _execute(stmt)
+    return (_encode(_dicts(result, tuple(result.keys()))) + '\n').encode()
+
+def stream_listing_json(stmt):
+    """Yield the listing as a JSON array, one batch of rows at a time.
+
+    Rows are read from the cursor in STREAM_BATCH_SIZE chunks, so only one
+    batch is held in memory however large the result is.
+    """
+    result = _execute(stmt, yield_per=STREAM_BATCH_SIZE)
+    fields = tuple(result.keys())
+    yield '['
+    first = True
+    for batch in result.partitions():
+        # Each batch encodes as an array; drop its brackets to splice it in.
+        chunk = _encode(_dicts(batch, fields))[1:-1]
+        yield chunk if first else ',' + chunk
+        first = False
+    yield ']\n'
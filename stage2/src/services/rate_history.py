@@ -0,0 +1,85 @@
+from sqlalchemy import func, insert, select
+
+from ..models import RateHistory
+
+# Rows inserted per executemany when recording a rates payload.
+INSERT_BATCH_SIZE = 500
+
+# Bucket label formats per dialect: strftime (SQLite), DATE_FORMAT (MySQL),
+# to_char (PostgreSQL). Labels sort in time order. A week is labelled by the
+# date of its Monday, since the databases number weeks differently.
+BUCKET_FORMATS = {
+    'hour': {'sqlite': '%Y-%m-%dT%H:00', 'mysql': '%Y-%m-%dT%H:00', 'postgresql': 'YYYY-MM-DD"T"HH24:00'},
+    'day': {'sqlite': '%Y-%m-%d', 'mysql': '%Y-%m-%d', 'postgresql': 'YYYY-MM-DD'},
+    'week': {'sqlite': '%Y-%m-%d', 'mysql': '%Y-%m-%d', 'postgresql': 'YYYY-MM-DD'},
+    'month': {'sqlite': '%Y-%m', 'mysql': '%Y-%m', 'postgresql': 'YYYY-MM'},
+}
+
+def record_rates(session, rates, fetched_at):
+    """Append every rate in ``rates`` to the history, stamped ``fetched_at``.
+
+    Returns:
+        int: Rows inserted.
+    """
+    rows = [
+        {'currency_code': code, 'fetched_at': fetched_at, 'rate': rate}
+        for code, rate in rates.items()
+        if isinstance(rate, (int, float)) and code and len(code) <= 8
+    ]
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        session.execute(insert(RateHistory), rows[start:start + INSERT_BATCH_SIZE])
+    return len(rows)
+
+def _week_start(column, dialect):
+    # The Monday on or before ``column``.
+    if dialect == 'sqlite':
+        return func.date(column, '-6 days', 'weekday 1')
+    if dialect == 'mysql':
+        return func.subdate(column, func.weekday(column))
+    return func.date_trunc('week', column)
+
+def _bucket_label(column, bucket, dialect):
+    fmt = BUCKET_FORMATS[bucket][dialect]
+    if bucket == 'week':
+        column = _week_start(column, dialect)
+    if dialect == 'sqlite':
+        return func.strftime(fmt, column)
+    if dialect == 'mysql':
+        return func.date_format(column, fmt)
+    return func.to_char(column, fmt)
+
+def rate_history(session, currency_code, start=None, end=None, bucket=None):
+    """Rates for one currency in [start, end], raw or aggregated per bucket.
+
+    Both forms are a single range scan of ix_rate_history_code_time_rate;
+    with ``bucket`` (one of BUCKET_FORMATS) the grouping is done by the
+    database, so only one row per bucket comes back.
+
+    Returns:
+        list: ``{'fetched_at', 'rate'}`` points, or ``{'bucket', 'count',
+        'avg', 'min', 'max'}`` per bucket, oldest first.
+    """
+    conditions = [RateHistory.currency_code == currency_code]
+    if start is not None:
+        conditions.append(RateHistory.fetched_at >= start)
+    if end is not None:
+        conditions.append(RateHistory.fetched_at <= end)
+
+    if bucket is None:
+        stmt = (select(RateHistory.fetched_at, RateHistory.rate)
+                .where(*conditions).order_by(RateHistory.fetched_at))
+        return [{'fetched_at': t.isoformat(), 'rate': rate} for t, rate in session.execute(stmt)]
+
+    label = _bucket_label(RateHistory.fetched_at, bucket, session.get_bind().dialect.name).label('bucket')
+    stmt = (select(
+        label,
+        func.count().label('count'),
+        func.avg(RateHistory.rate).label('avg'),
+        func.min(RateHistory.rate).label('min'),
+        func.max(RateHistory.rate).label('max'),
+    ).where(*conditions).group_by(label).order_by(label))
+    return [
+        {'bucket': row.bucket, 'count': row.count, 'avg': float(row.avg),
+         'min': float(row.min), 'max': float(row.max)}
+        for row in session.execute(stmt)
+    ]
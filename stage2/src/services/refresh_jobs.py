@@ -0,0 +1,208 @@
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..database import db
+from ..models import Meta, RefreshJob
+from . import refresh_service
+from .refresh_service import ExternalAPIError, get_meta
+
+# Finished jobs kept around for status polling; the oldest are dropped first.
+MAX_JOBS = 50
+
+# Functions listed in a profiled job's text summary, by cumulative time.
+PROFILE_TOP = 25
+
+# Error reported by jobs whose upstream fetch failed (a 503, not a 500).
+UPSTREAM_UNAVAILABLE = 'External data source unavailable'
+
+# What each kind of job runs.
+TASKS = {
+    'refresh': refresh_service.refresh_all,
+    'recompute': refresh_service.recompute_from_rates,
+}
+
+# Meta key held by the job that is running, in whichever worker.
+LOCK_KEY = 'jobs.lock'
+
+# A job holding the lock (or queued) for longer than this is taken to have
+# lost its worker: the lock is taken over and new requests stop joining it.
+JOB_LEASE_SECONDS = 600
+
+# How often a job waiting for the lock, or a caller waiting for a job run
+# by another worker, checks the database again.
+POLL_SECONDS = 0.2
+
+ACTIVE = ('queued', 'running')
+
+# Jobs run one at a time per worker, off the request thread; LOCK_KEY keeps
+# them to one at a time across workers, so they never write the same rows
+# or Meta keys at once.
+_runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='refresh-job')
+_lock = threading.Lock()
+# Set when a job run by this worker finishes, so waiting on it needs no polling.
+_events = {}
+
+def get_job(job_id):
+    """The job as last committed by whichever worker runs it, or None."""
+    stmt = select(RefreshJob).where(RefreshJob.id == job_id).execution_options(populate_existing=True)
+    return db.session.execute(stmt).scalar()
+
+def wait_for(job_id, timeout=None):
+    """Block until the job has finished.
+
+    Returns:
+        RefreshJob: The finished job, or None if it is unknown or still
+        running after ``timeout`` seconds.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _lock:
+        event = _events.get(job_id)
+    if event is not None:
+        event.wait(timeout)
+
+    while True:
+        # End the read transaction so each poll sees newly committed state.
+        db.session.rollback()
+        job = get_job(job_id)
+        if job is None or job.finished:
+            return job
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
+        time.sleep(POLL_SECONDS)
+
+def _try_lock(session, token):
+    try:
+        session.execute(insert(Meta).values(key=LOCK_KEY, value=token))
+        session.commit()
+        return True
+    except IntegrityError:
+        session.rollback()
+
+    holder = get_meta(session, LOCK_KEY)
+    if holder and time.time() - float(holder.split()[1]) > JOB_LEASE_SECONDS:
+        # Its worker died mid-job: fail that job and free the lock.
+        session.execute(update(RefreshJob).where(
+            RefreshJob.id == holder.split()[0], RefreshJob.status.in_(ACTIVE),
+        ).values(status='failed', finished_at=datetime.now(),
+                 error={'error': 'Abandoned: the worker running it stopped'}))
+        session.execute(delete(Meta).where(Meta.key == LOCK_KEY, Meta.value == holder))
+        session.commit()
+    return False
+
+def _profiled(report, func, *args, **kwargs):
+    # Keeps the raw stats for download and a short text summary for the status.
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+        report['profile'] = summary.getvalue()
+        report['profile_stats'] = marshal.dumps(stats.stats)
+
+def _run(app, job_id, kind, timeout_seconds, profile=False):
+    token = f'{job_id} {time.time()}'
+    try:
+        with app.app_context():
+            session = db.session
+            while not _try_lock(session, token):
+                time.sleep(POLL_SECONDS)
+            try:
+                _execute(app, session, job_id, kind, timeout_seconds, profile)
+            finally:
+                session.rollback()
+                session.execute(delete(Meta).where(Meta.key == LOCK_KEY, Meta.value == token))
+                session.commit()
+    finally:
+        with _lock:
+            event = _events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+def _execute(app, session, job_id, kind, timeout_seconds, profile):
+    session.execute(update(RefreshJob).where(RefreshJob.id == job_id)
+                    .values(status='running', started_at=datetime.now()))
+    session.commit()
+
+    # The task fills its own dict; polls only ever see the finished copy.
+    timings, report, outcome = {}, {}, {}
+    try:
+        kwargs = {'timeout_seconds': timeout_seconds, 'timings': timings}
+        if profile:
+            data = _profiled(report, TASKS[kind], **kwargs)
+        else:
+            data = TASKS[kind](**kwargs)
+        outcome['result'] = {
+            'total_countries': data['total'],
+            'changed_countries': data['changed'],
+            'skipped_countries': data['skipped'],
+            'rows': data['rows'],
+            'last_refreshed_at': data['last_refreshed_at'],
+        }
+        outcome['status'] = 'succeeded'
+    except ExternalAPIError as e:
+        outcome['error'] = {'error': UPSTREAM_UNAVAILABLE, 'details': str(e)}
+        outcome['status'] = 'failed'
+    except Exception as e:
+        app.logger.exception('%s failed', kind.capitalize())
+        outcome['error'] = {'error': f'Internal server error: {e}'}
+        outcome['status'] = 'failed'
+    finally:
+        session.rollback()
+        session.execute(update(RefreshJob).where(RefreshJob.id == job_id).values(
+            finished_at=datetime.now(), phases=timings, status=outcome.get('status', 'failed'),
+            **report, **{k: v for k, v in outcome.items() if k != 'status'},
+        ))
+        session.commit()
+
+def _prune(session):
+    oldest_kept = session.execute(
+        select(RefreshJob.submitted_at).order_by(RefreshJob.submitted_at.desc()).offset(MAX_JOBS - 1).limit(1)
+    ).scalar()
+    if oldest_kept is not None:
+        session.execute(delete(RefreshJob).where(
+            RefreshJob.submitted_at < oldest_kept, RefreshJob.status.not_in(ACTIVE)))
+
+def submit_refresh(app, timeout_seconds=30, profile=False, kind='refresh'):
+    """Start a refresh in the background, or join the one already queued or running.
+
+    ``kind`` picks the task from TASKS; a job of another kind that is
+    already running, in this worker or another, finishes first. With
+    ``profile`` the new job runs under cProfile; a call that joins a job
+    gets it as it is, profiled or not.
+
+    Two workers submitting at the same instant can each queue a job; the
+    lock still runs them one after the other.
+
+    Returns:
+        tuple: (RefreshJob, True if this call started it)
+    """
+    session = db.session
+    now = datetime.now()
+    active = session.execute(select(RefreshJob).where(
+        RefreshJob.kind == kind, RefreshJob.status.in_(ACTIVE),
+        RefreshJob.submitted_at >= now - timedelta(seconds=JOB_LEASE_SECONDS),
+    ).order_by(RefreshJob.submitted_at.desc()).limit(1)).scalar()
+    if active is not None:
+        return active, False
+
+    job = RefreshJob(id=uuid.uuid4().hex, kind=kind, status='queued', submitted_at=now)
+    session.add(job)
+    _prune(session)
+    session.commit()
+
+    with _lock:
+        _events[job.id] = threading.Event()
+    _runner.submit(_run, app, job.id, kind, timeout_seconds, profile)
+    return job, True
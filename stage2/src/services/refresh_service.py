@@ -1,17 +1,227 @@
-import requests
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime
 from random import randint
-from sqlalchemy import func
-from ..models import Country, Meta
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from sqlalchemy import insert, select, update
+
+from ..models import Country, Meta, normalize_name
 from ..database import db
-from ..utils.image_generator import generate_summary_image
+from .rate_history import record_rates
+from ..utils.image_generator import IMAGE_FORMATS, generate_summary_image, summary_digest, summary_path
+from ..utils.json_stream import CHUNK_SIZE, iter_json_file
+from ..utils.metrics import REGISTRY
 
 COUNTRIES_API = 'https://restcountries.com/v2/all?fields=name,capital,region,population,flag,currencies'
 RATES_API = 'https://open.er-api.com/v6/latest/USD'
 
+# Countries written to the database per flush during a refresh.
+WRITE_BATCH_SIZE = 100
+
 class ExternalAPIError(Exception):
     pass
 
+PHASE_SECONDS = REGISTRY.histogram(
+    'refresh_phase_seconds', 'Wall time spent in each phase of a refresh or recompute.', ['phase'])
+REFRESH_RUNS = REGISTRY.counter(
+    'refresh_runs_total', 'Refresh and recompute runs by outcome.', ['kind', 'outcome'])
+REFRESH_ROWS = REGISTRY.counter(
+    'refresh_rows_total', 'Countries handled by refreshes, by what was done with them.', ['result'])
+DOWNLOADED_BYTES = REGISTRY.counter(
+    'refresh_downloaded_bytes_total', 'Response body bytes downloaded from each upstream.', ['source'])
+
+# Both upstreams are fetched at the same time over one keep-alive session.
+_http = None
+_fetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='refresh-fetch')
+
+def _get_http():
+    global _http
+    if _http is None:
+        _http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        _http.mount('http://', adapter)
+        _http.mount('https://', adapter)
+    return _http
+
+# Meta keys kept per source so the next refresh can send a conditional
+# request and recognise an unchanged body.
+SOURCES = ('countries', 'rates')
+VALIDATOR_FIELDS = ('etag', 'last_modified', 'hash')
+
+# Countries bodies up to this size stay in memory while downloaded;
+# larger ones spill to a temporary file.
+SPOOL_MAX_BYTES = 1024 * 1024
+
+# Last parsed exchange-rate body per URL as (hash, payload), so a 304 can be
+# served from memory. Conditional headers are only sent when this matches
+# the stored hash.
+_bodies = {}
+
+def _conditional_headers(validators):
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def _response_validators(response, headers, digest):
+    return {
+        'etag': response.headers.get('ETag') or headers.get('If-None-Match'),
+        'last_modified': response.headers.get('Last-Modified') or headers.get('If-Modified-Since'),
+        'hash': digest,
+    }
+
+def _fetch_json(url, deadline, validators=None, source='rates'):
+    validators = validators or {}
+    headers = {}
+    cached = _bodies.get(url)
+    if cached and validators.get('hash') and cached[0] == validators['hash']:
+        headers = _conditional_headers(validators)
+
+    remaining = max(deadline - time.monotonic(), 0.001)
+    response = _get_http().get(url, timeout=remaining, headers=headers)
+
+    if response.status_code == 304 and headers:
+        digest, payload = cached
+    else:
+        response.raise_for_status()
+        DOWNLOADED_BYTES.inc(len(response.content), source=source)
+        digest = hashlib.sha256(response.content).hexdigest()
+        payload = response.json()
+        _bodies[url] = (digest, payload)
+
+    return payload, _response_validators(response, headers, digest)
+
+def _fetch_to_file(url, deadline, validators=None, source='countries'):
+    """Download ``url`` into a spooled temporary file, hashing it on the way.
+
+    A 304 needs no body (an unchanged countries payload is simply not
+    re-read), so the request is conditional whenever a hash is on record.
+
+    Returns:
+        tuple: (file positioned at 0, or None when not modified; validators)
+    """
+    validators = validators or {}
+    headers = _conditional_headers(validators) if validators.get('hash') else {}
+
+    remaining = max(deadline - time.monotonic(), 0.001)
+    with _get_http().get(url, timeout=remaining, headers=headers, stream=True) as response:
+        if response.status_code == 304 and headers:
+            return None, _response_validators(response, headers, validators['hash'])
+        response.raise_for_status()
+
+        digest = hashlib.sha256()
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        try:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                # The socket timeout is per read; hold the whole body to the deadline.
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f'{url} did not finish before the deadline')
+                digest.update(chunk)
+                body.write(chunk)
+                DOWNLOADED_BYTES.inc(len(chunk), source=source)
+        except BaseException:
+            body.close()
+            raise
+
+    body.seek(0)
+    return body, _response_validators(response, headers, digest.hexdigest())
+
+def fetch_sources(timeout_seconds=30, validators=None):
+    """Fetch the countries and exchange-rate payloads concurrently.
+
+    Both requests share one deadline of ``timeout_seconds`` from now, so a
+    refresh waits for the slower upstream rather than the sum of both.
+    ``validators`` maps each name in ``SOURCES`` to the etag/last_modified/hash
+    of the previous fetch; when given, requests are made conditional.
+
+    The countries body is not parsed here: it comes back as a file to read
+    with ``iter_countries`` (the caller closes it), or None if the upstream
+    answered 304.
+
+    Returns:
+        tuple: (countries file or None, rates dict, validators for this fetch)
+
+    Raises:
+        ExternalAPIError: If either source fails or the deadline passes.
+    """
+    validators = validators or {}
+    deadline = time.monotonic() + timeout_seconds
+    sources = [
+        (_fetch_pool.submit(_fetch_to_file, COUNTRIES_API, deadline, validators.get('countries')), 'Countries API'),
+        (_fetch_pool.submit(_fetch_json, RATES_API, deadline, validators.get('rates')), 'Exchange Rates API'),
+    ]
+
+    results = []
+    for future, source in sources:
+        try:
+            results.append(future.result(timeout=max(deadline - time.monotonic(), 0)))
+        except Exception:
+            if results and results[0][0] is not None:
+                results[0][0].close()
+            raise ExternalAPIError(f'Could not fetch data from {source}')
+
+    (countries, countries_validators), (rates_payload, rates_validators) = results
+    rates = rates_payload.get('rates', {}) if isinstance(rates_payload, dict) else {}
+    return countries, rates, {'countries': countries_validators, 'rates': rates_validators}
+
+def iter_countries(body):
+    """Countries from a body returned by ``fetch_sources``, parsed one at a time.
+
+    Raises:
+        ExternalAPIError: If the body is not a JSON array.
+    """
+    try:
+        yield from iter_json_file(body, CHUNK_SIZE)
+    except ValueError:
+        raise ExternalAPIError('Could not parse data from Countries API')
+
+def load_validators(session):
+    """Stored validators for every source, as passed to ``fetch_sources``."""
+    keys = [f'{source}.{field}' for source in SOURCES for field in VALIDATOR_FIELDS]
+    stored = {m.key: m.value for m in session.query(Meta).filter(Meta.key.in_(keys))}
+    return {
+        source: {field: stored.get(f'{source}.{field}') for field in VALIDATOR_FIELDS}
+        for source in SOURCES
+    }
+
+def forget_sources(session):
+    """Drop the stored countries hash so the next refresh rewrites every row.
+
+    Call this when countries are changed outside a refresh, e.g. deleted.
+    """
+    # Only the countries body feeds rows back in; the rates are unaffected.
+    session.query(Meta).filter(Meta.key == 'countries.hash').delete(synchronize_session=False)
+
+def get_meta(session, key):
+    """A Meta value read from the database, bypassing the session identity map."""
+    return session.execute(select(Meta.value).where(Meta.key == key)).scalar()
+
+def current_generation(session):
+    """The ``cache_generation`` stamp, read from the database every time."""
+    return get_meta(session, 'cache_generation')
+
+def bump_generation(session):
+    """Invalidate cached country responses in every worker on commit."""
+    _set_meta(session, 'cache_generation', uuid.uuid4().hex)
+
+def _set_meta(session, key, value):
+    meta = session.get(Meta, key)
+    if meta:
+        meta.value = value
+    else:
+        session.add(Meta(key=key, value=value))
+
 def validate_country_payload(country):
     errors = {}
 
@@ -33,103 +243,363 @@ def pick_currency_code(currencies):
     first = currencies[0]
     return first.get('code') if isinstance(first, dict) else None
 
-def compute_estimated_gdp(population, exchange_rate) -> float | None:
+def compute_estimated_gdp(population, exchange_rate, multiplier=None) -> float | None:
     if exchange_rate is None:
         return None
-    multiplier = randint(1000, 2000)
+    if multiplier is None:
+        multiplier = randint(1000, 2000)
     return (population * multiplier) / exchange_rate
 
-def refresh_all(timeout_seconds=30):
+def _multiplier_seed():
+    return current_app.config.get('GDP_MULTIPLIER_SEED') or None
+
+@lru_cache(maxsize=65536)
+def _seeded_multiplier(seed, key):
+    digest = hashlib.blake2b(f'{seed}:{key}'.encode(), digest_size=8).digest()
+    return 1000 + int.from_bytes(digest, 'big') % 1001
+
+def gdp_multiplier(key, seed=None):
+    """The GDP multiplier in [1000, 2000] for the country with normalized name ``key``.
+
+    With a seed it is a fixed function of (seed, key), so estimated_gdp can
+    be reproduced and cached; without one it is a fresh randint draw.
+    """
+    if seed is None:
+        return randint(1000, 2000)
+    return _seeded_multiplier(seed, key)
+
+def _timed_iter(iterable, timings, name):
+    """Yield from ``iterable``, adding the time spent producing items to ``timings[name]``."""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        yield item
+
+@contextmanager
+def _observed(kind, timings):
+    """Publish a run's outcome, phase timings and row counts once it ends.
+
+    The block sets ``run['outcome']`` and ``run['rows']`` on the dict it is
+    given; an exception records the run as ``failed``.
+    """
+    run = {'outcome': 'succeeded', 'rows': {}}
     try:
-        response1 = requests.get(COUNTRIES_API, timeout=timeout_seconds)
-        response1.raise_for_status()
-    except Exception:
-        raise ExternalAPIError('Could not fetch data from Countries API')
+        yield run
+    except BaseException:
+        run['outcome'] = 'failed'
+        raise
+    finally:
+        REFRESH_RUNS.inc(kind=kind, outcome=run['outcome'])
+        for phase, seconds in timings.items():
+            PHASE_SECONDS.observe(seconds, phase=phase)
+        for result, count in run['rows'].items():
+            REFRESH_ROWS.inc(count, result=result)
 
+@contextmanager
+def _phase(timings, name):
+    """Add the wall time of the block to ``timings[name]``, if collecting."""
+    start = time.perf_counter()
     try:
-        response2 = requests.get(RATES_API, timeout=timeout_seconds)
-        response2.raise_for_status()
-    except Exception:
-        raise ExternalAPIError('Could not fetch data from Exchange Rates API')
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
 
-    countries = response1.json()
-    rates = response2.json().get('rates', {}) if isinstance(response2.json(), dict) else {}
-    now = datetime.now()
+# Upstream-derived columns compared to decide whether a stored row changed.
+COMPARED_FIELDS = ('capital', 'region', 'population', 'currency_code', 'exchange_rate', 'flag_url')
 
-    session = db.session()
-    try:
-        for country in countries:
-            name = country.get('name')
-            population = country.get('population')
-            capital = country.get('capital')
-            region = country.get('region')
-            flag = country.get('flag')
-            currencies = country.get('currencies')
-            currency_code = pick_currency_code(currencies)
-
-            if not currencies or len(currencies) == 0:
-                currency_code = None
-                exchange_rate = None
-                estimated_gdp = 0
-
-            elif currency_code not in rates:
-                exchange_rate = None
-                estimated_gdp = None
-
-            else:
-                exchange_rate = rates[currency_code]
-                estimated_gdp = compute_estimated_gdp(population, exchange_rate)
-
-            existing = session.query(Country).filter(
-                func.lower(Country.name) == name.lower()
-            ).one_or_none()
-
-            if existing:
-                existing.capital = capital
-                existing.region = region
-                existing.population = population
-                existing.currency_code = currency_code
-                existing.exchange_rate = exchange_rate
-                existing.estimated_gdp = estimated_gdp
-                existing.flag_url = flag
-                existing.last_refreshed_at = now
-                session.add(existing)
-            else:
-                new = Country(
-                    name=name,
-                    capital=capital,
-                    region=region,
-                    population=population,
-                    currency_code=currency_code,
-                    exchange_rate=exchange_rate,
-                    estimated_gdp=estimated_gdp,
-                    flag_url=flag,
-                    last_refreshed_at=now,
-                )
-                session.add(new)
-        session.commit()
+def _country_fields(country, rates):
+    currencies = country.get('currencies')
+    currency_code = pick_currency_code(currencies)
+
+    if not currencies or len(currencies) == 0:
+        currency_code = None
+        exchange_rate = None
+    else:
+        exchange_rate = rates.get(currency_code)
+
+    return {
+        'capital': country.get('capital'),
+        'region': country.get('region'),
+        'population': country.get('population'),
+        'currency_code': currency_code,
+        'exchange_rate': exchange_rate,
+        'flag_url': country.get('flag'),
+    }
+
+def _write_batch(session, inserts, updates):
+    # ORM bulk INSERT / UPDATE-by-primary-key from plain dicts: one
+    # executemany each, and no Country instances kept in the session.
+    if inserts:
+        session.execute(insert(Country), inserts)
+        inserts.clear()
+    if updates:
+        session.execute(update(Country), updates)
+        updates.clear()
+
+def _upsert_countries(session, countries, rates, now):
+    """Write the countries whose upstream fields differ from the stored row.
+
+    ``countries`` can be any iterable and is consumed once. Payloads failing
+    ``validate_country_payload`` on name or population are skipped (a missing
+    currency is stored with an estimated_gdp of 0), as are repeats of a name
+    already seen in this payload.
+
+    Returns:
+        dict: Countries ``inserted``, ``updated``, ``unchanged`` and ``skipped``.
+    """
+    # Plain tuples rather than ORM objects, so memory held across the whole
+    # payload is one small entry per stored country.
+    stored = {
+        row[0]: (row[1], tuple(row[2:]))
+        for row in session.execute(select(
+            Country.name_normalized, Country.id, *(getattr(Country, f) for f in COMPARED_FIELDS)))
+    }
+    seen = set()
+    inserts, updates = [], []
+    rows = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    seed = _multiplier_seed()
+
+    for country in countries:
+        errors = validate_country_payload(country) if isinstance(country, dict) else {'country': 'is not an object'}
+        errors.pop('currency_code', None)
+        if errors:
+            rows['skipped'] += 1
+            continue
+
+        name = country['name']
+        key = normalize_name(name)
+        if key in seen:
+            rows['skipped'] += 1
+            continue
+        seen.add(key)
+
+        fields = _country_fields(country, rates)
+        row = stored.get(key)
+
+        # Leave rows whose upstream fields are unchanged untouched, so
+        # their estimated_gdp keeps its multiplier too.
+        if row and row[1] == tuple(fields[f] for f in COMPARED_FIELDS):
+            rows['unchanged'] += 1
+            continue
+
+        if fields['currency_code'] is None:
+            fields['estimated_gdp'] = 0
+        else:
+            fields['estimated_gdp'] = compute_estimated_gdp(
+                fields['population'], fields['exchange_rate'], gdp_multiplier(key, seed))
+        fields['last_refreshed_at'] = now
+
+        if row:
+            updates.append({'id': row[0], **fields})
+            rows['updated'] += 1
+        else:
+            inserts.append({'name': name, 'name_normalized': key, **fields})
+            rows['inserted'] += 1
+
+        if len(inserts) + len(updates) >= WRITE_BATCH_SIZE:
+            _write_batch(session, inserts, updates)
+
+    _write_batch(session, inserts, updates)
+    return rows
+
+def recompute_gdp(session, rates, now, seed=None):
+    """Re-rate every stored country and recompute estimated_gdp in one pass.
+
+    The needed columns are read once and processed as parallel lists: the
+    rate column is looked up from ``rates`` by currency, the multiplier
+    column comes from ``gdp_multiplier``, and the GDP column is computed
+    from the three. Only rows whose exchange_rate or estimated_gdp change
+    are written. Without a seed a row's multiplier is redrawn only when its
+    rate changes, as in ``_upsert_countries``.
+
+    Returns:
+        int: Rows updated.
+    """
+    rows = session.execute(select(
+        Country.id, Country.name_normalized, Country.population,
+        Country.exchange_rate, Country.estimated_gdp, Country.currency_code,
+    ).where(Country.currency_code.is_not(None))).all()
+    if not rows:
+        return 0
+
+    ids, keys, populations, old_rates, old_gdps, codes = zip(*rows)
+    new_rates = list(map(rates.get, codes))
+    if seed is None:
+        multipliers = [None if new == old else randint(1000, 2000) for new, old in zip(new_rates, old_rates)]
+    else:
+        multipliers = [_seeded_multiplier(seed, key) for key in keys]
+    gdps = [
+        old_gdp if m is None else (None if r is None else p * m / r)
+        for p, r, m, old_gdp in zip(populations, new_rates, multipliers, old_gdps)
+    ]
 
-        # After commit generate image
-        total = session.query(Country).count()
+    updates = []
+    changed = 0
+    for i in range(len(ids)):
+        if new_rates[i] == old_rates[i] and gdps[i] == old_gdps[i]:
+            continue
+        updates.append({'id': ids[i], 'exchange_rate': new_rates[i], 'estimated_gdp': gdps[i], 'last_refreshed_at': now})
+        changed += 1
+        if len(updates) >= WRITE_BATCH_SIZE:
+            _write_batch(session, [], updates)
+
+    _write_batch(session, [], updates)
+    return changed
+
+def _summary_missing(session):
+    """True if the current summary image is not on disk in every format.
+
+    Covers ``make clear-cache``, a fresh container on an existing database
+    and databases from before the image was content-addressed.
+    """
+    digest = get_meta(session, 'summary_image')
+    return not digest or not all(os.path.exists(summary_path(digest, fmt)) for fmt in IMAGE_FORMATS)
+
+def _render_summary(session, total, timestamp, timings):
+    with _phase(timings, 'render'):
         top5_q = session.query(Country).filter(Country.estimated_gdp is not None).order_by(
             Country.estimated_gdp.desc()).limit(5).all()
         top5 = [{'name': c.name, 'estimated_gdp': c.estimated_gdp} for c in top5_q]
 
-        image_path = generate_summary_image(total, top5, now)
+        image_path = generate_summary_image(total, top5, timestamp)
+        _set_meta(session, 'summary_image', summary_digest(total, top5))
+    return image_path
 
-        # Update Meta table
-        meta = session.query(Meta).filter(Meta.key == 'last_refreshed_at').one_or_none()
-        if meta:
-            meta.value = now.isoformat()
-        else:
-            meta = Meta(key='last_refreshed_at', value=now.isoformat())
-            session.add(meta)
+def _finish(session, rows, now, validators, timings):
+    """Render the summary if rows changed or it is missing, record Meta, commit and report.
+
+    The row writes are still uncommitted here and go in the same commit as
+    the new ``cache_generation`` and validators. Committing the rows first
+    would let a failed render or Meta write leave them saved under the old
+    stamp, with nothing to bump it later: the next refresh finds every row
+    up to date, and cached responses stay stale.
+    """
+    changed = rows.get('inserted', 0) + rows.get('updated', 0)
+    total = session.query(Country).count()
+    image_path = None
+
+    # Regenerate the image when the rows behind it changed, or it is gone
+    if changed or _summary_missing(session):
+        image_path = _render_summary(session, total, now, timings)
+
+    # Update Meta table
+    _set_meta(session, 'last_refreshed_at', now.isoformat())
+    if changed:
+        bump_generation(session)
+    for source, fields in validators.items():
+        for field in VALIDATOR_FIELDS:
+            _set_meta(session, f'{source}.{field}', fields[field])
+    with _phase(timings, 'commit'):
         session.commit()
 
-        return {'total': total, 'last_refreshed_at': now.isoformat(), 'image_path': image_path}
-    except ExternalAPIError:
-        session.rollback()
-        raise
-    except Exception:
-        session.rollback()
-        raise
+    return {
+        'total': total,
+        'last_refreshed_at': now.isoformat(),
+        'image_path': image_path,
+        'changed': changed,
+        'skipped': rows.get('skipped', 0),
+        'rows': rows,
+    }
+
+def recompute_from_rates(timeout_seconds=30, timings=None):
+    """Fetch only the exchange rates and recompute every stored country's GDP.
+
+    The countries source is not contacted. Rows are updated by
+    ``recompute_gdp``, so with a GDP_MULTIPLIER_SEED this also applies a
+    changed seed to the stored estimates.
+
+    Raises:
+        ExternalAPIError: If the rates cannot be fetched in time.
+    """
+    timings = {} if timings is None else timings
+    session = db.session()
+    with _observed('recompute', timings) as run:
+        with _phase(timings, 'fetch'):
+            previous = load_validators(session)
+            try:
+                payload, validators = _fetch_json(RATES_API, time.monotonic() + timeout_seconds, previous['rates'])
+            except Exception:
+                raise ExternalAPIError('Could not fetch data from Exchange Rates API')
+        rates = payload.get('rates', {}) if isinstance(payload, dict) else {}
+
+        try:
+            now = datetime.now()
+            with _phase(timings, 'upsert'):
+                if validators['hash'] != previous['rates']['hash']:
+                    record_rates(session, rates, now)
+                run['rows'] = {'updated': recompute_gdp(session, rates, now, _multiplier_seed())}
+            return _finish(session, run['rows'], now, {'rates': validators}, timings)
+        except Exception:
+            session.rollback()
+            raise
+
+def refresh_all(timeout_seconds=30, timings=None):
+    """Fetch both upstreams and write every changed country.
+
+    The countries body is parsed incrementally and written in
+    WRITE_BATCH_SIZE batches, so memory does not grow with its size. If only
+    the exchange rates changed, the stored rows are re-rated without reading
+    the countries body at all.
+
+    When ``timings`` is a dict, the seconds spent in each phase are stored in
+    it under ``fetch``, ``parse``, ``upsert``, ``commit`` and ``render`` as
+    they complete. ``upsert`` excludes the time spent parsing the body.
+    """
+    timings = {} if timings is None else timings
+    session = db.session()
+    with _observed('refresh', timings) as run:
+        with _phase(timings, 'fetch'):
+            previous = load_validators(session)
+            countries_body, rates, current = fetch_sources(timeout_seconds, previous)
+
+        try:
+            countries_changed = current['countries']['hash'] != previous['countries']['hash']
+            rates_changed = current['rates']['hash'] != previous['rates']['hash']
+
+            # Neither upstream body changed since the last refresh: nothing to write.
+            if not countries_changed and not rates_changed:
+                run['outcome'] = 'unchanged'
+                last = get_meta(session, 'last_refreshed_at')
+                total = session.query(Country).count()
+                image_path = None
+                if _summary_missing(session):
+                    stamp = datetime.fromisoformat(last) if last else datetime.now()
+                    image_path = _render_summary(session, total, stamp, timings)
+                    with _phase(timings, 'commit'):
+                        session.commit()
+                return {
+                    'total': total,
+                    'last_refreshed_at': last,
+                    'image_path': image_path,
+                    'changed': 0,
+                    'skipped': 0,
+                    'rows': {},
+                }
+
+            now = datetime.now()
+            with _phase(timings, 'upsert'):
+                if rates_changed:
+                    record_rates(session, rates, now)
+                if countries_changed:
+                    countries = _timed_iter(iter_countries(countries_body), timings, 'parse')
+                    run['rows'] = _upsert_countries(session, countries, rates, now)
+                else:
+                    run['rows'] = {'updated': recompute_gdp(session, rates, now, _multiplier_seed())}
+            if 'parse' in timings:
+                timings['upsert'] -= timings['parse']
+
+            # One transaction with the stamp and validators: see _finish.
+            return _finish(session, run['rows'], now, current, timings)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            if countries_body is not None:
+                countries_body.close()
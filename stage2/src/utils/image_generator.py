@@ -1,21 +1,42 @@
+import hashlib
+import io
+import json
 import os
+from functools import lru_cache
+
 from PIL import Image, ImageDraw, ImageFont
 
 CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache')
 
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-def generate_summary_image(total, top5, timestamp):
-    width, height = 1200, 800
-    img = Image.new('RGB', (width, height), color='white')
-    draw = ImageDraw.Draw(img)
+# Output formats written for every summary, with their mimetypes.
+IMAGE_FORMATS = {'png': 'image/png', 'webp': 'image/webp'}
+
+# Older summaries kept on disk next to the current one.
+KEEP_IMAGES = 5
 
+@lru_cache(maxsize=1)
+def _fonts():
+    # Loaded once per process; truetype() parses the font file on every call.
     try:
-        title_font = ImageFont.truetype('DejaVuSans-Bold.ttf', 36)
-        text_font = ImageFont.truetype('DejaVuSans.ttf', 20)
+        return ImageFont.truetype('DejaVuSans-Bold.ttf', 36), ImageFont.truetype('DejaVuSans.ttf', 20)
     except Exception:
-        title_font = ImageFont.load_default()
-        text_font = ImageFont.load_default()
+        return ImageFont.load_default(), ImageFont.load_default()
+
+def summary_digest(total, top5):
+    """Content address of a summary: the same countries give the same digest."""
+    payload = json.dumps([total, top5], sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode(), digest_size=12).hexdigest()
+
+def summary_path(digest, fmt='png'):
+    return os.path.join(CACHE_DIR, f'summary-{digest}.{fmt}')
+
+def _render(total, top5, timestamp):
+    width, height = 1200, 800
+    img = Image.new('RGB', (width, height), color='white')
+    draw = ImageDraw.Draw(img)
+    title_font, text_font = _fonts()
 
     draw.text((40, 30), "Countries Summary", font=title_font, fill=(10, 10, 10))
     draw.text((40, 80), f'Total Countries: {total}', font=text_font, fill=(0, 0, 0))
@@ -29,6 +50,64 @@ def generate_summary_image(total, top5, timestamp):
         draw.text((60, y), line, font=text_font, fill=(0, 0, 0))
         y += 34
 
-    out_path = os.path.join(CACHE_DIR, 'summary.png')
-    img.save(out_path)
-    return out_path
+    # Black text on white: a small palette keeps the PNG a fraction of RGB size.
+    return img.quantize(colors=16)
+
+def _save(img, path, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        img.convert('RGB').save(buffer, 'WEBP', lossless=True, method=6)
+    else:
+        img.save(buffer, 'PNG', optimize=True)
+
+    # Write then rename so readers never see a partial file.
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, path)
+
+def _prune(keep_digest):
+    summaries = sorted(
+        (entry for entry in os.scandir(CACHE_DIR)
+         if entry.name.startswith('summary-') and not entry.name.endswith('.tmp')
+         and not entry.name.startswith(f'summary-{keep_digest}.')),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in summaries[KEEP_IMAGES * len(IMAGE_FORMATS):]:
+        os.remove(entry.path)
+
+def generate_summary_image(total, top5, timestamp):
+    """Write the summary image in every IMAGE_FORMATS format; return the PNG path.
+
+    Files are named by ``summary_digest(total, top5)``, so a summary that
+    is already on disk is not rendered again and keeps the timestamp of the
+    refresh that first produced it.
+    """
+    digest = summary_digest(total, top5)
+    paths = {fmt: summary_path(digest, fmt) for fmt in IMAGE_FORMATS}
+    missing = [fmt for fmt, path in paths.items() if not os.path.exists(path)]
+
+    if missing:
+        img = _render(total, top5, timestamp)
+        for fmt in missing:
+            _save(img, paths[fmt], fmt)
+        _prune(digest)
+    return paths['png']
+
+@lru_cache(maxsize=8)
+def _read(path):
+    # A missing file raises, and lru_cache does not cache exceptions.
+    with open(path, 'rb') as f:
+        return f.read()
+
+def load_summary_image(digest, fmt='png'):
+    """Bytes of a stored summary, kept in memory; None if it is not on disk.
+
+    Files are immutable once written under their digest, so caching the
+    bytes by name is always safe.
+    """
+    try:
+        return _read(summary_path(digest, fmt))
+    except FileNotFoundError:
+        return None
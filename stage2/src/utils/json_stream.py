@@ -0,0 +1,85 @@
+import codecs
+import json
+
+# Bytes read from the source per step.
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_SKIP = ' \t\r\n,'
+
+def iter_json_array(chunks):
+    """Yield the elements of a top-level JSON array from chunks of text.
+
+    Only the element being decoded and the unread tail of the current chunk
+    are held, so memory depends on the largest element rather than on the
+    whole document.
+
+    Raises:
+        ValueError: If the document is not a well-formed JSON array.
+    """
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in (_SKIP if started else ' \t\r\n'):
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError('Unexpected end of JSON array')
+            fill()
+            continue
+
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError('Expected a JSON array')
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == ']':
+            return
+
+        try:
+            value, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError('Malformed element in JSON array')
+            fill()
+            continue
+
+        # A number can decode from a prefix of itself ("2" out of "2.5"),
+        # so only trust an element once the character after it is seen.
+        if end == len(buffer) or buffer[end] not in _SKIP + ']':
+            if eof:
+                raise ValueError('Malformed element in JSON array')
+            fill()
+            continue
+
+        pos = end
+        yield value
+
+def iter_json_file(f, chunk_size=CHUNK_SIZE):
+    """``iter_json_array`` over a binary file of UTF-8 JSON."""
+    reader = iter(lambda: f.read(chunk_size), b'')
+    return iter_json_array(_decode_utf8(reader))
+
+def _decode_utf8(chunks):
+    # Incremental decoding so a character split across chunks survives.
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
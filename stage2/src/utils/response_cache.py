@@ -0,0 +1,57 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+CachedBody = namedtuple('CachedBody', ['etag', 'body'])
+
+
+class ResponseCache:
+    """Serialized JSON bodies for the current ``cache_generation``, LRU by bytes.
+
+    Any write to the countries bumps the one stamp in Meta, which makes every
+    cached body stale at once. So the cache holds a single generation and
+    empties itself when a request reads a newer one.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        """The body cached for ``key`` at ``generation``, or None."""
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._bytes = 0
+                self._generation = generation
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, generation, body):
+        """Cache ``body`` built at ``generation``; return it with an ETag over the bytes.
+
+        A body built before the generation moved on, or larger than a quarter
+        of the budget, is returned without being cached.
+        """
+        entry = CachedBody(hashlib.blake2b(body, digest_size=16).hexdigest(), body)
+        if len(body) > self.max_bytes // 4:
+            return entry
+
+        with self._lock:
+            if generation != self._generation:
+                return entry
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+        return entry
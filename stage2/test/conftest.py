@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+# The app is imported as ``src`` from this directory, as wsgi.py does.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_upstream import StubUpstream, make_countries  # noqa: E402
+from src.app import create_app  # noqa: E402
+from src.config import Config  # noqa: E402
+from src.database import db  # noqa: E402
+from src.services import refresh_service  # noqa: E402
+from src.utils import image_generator  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'countries.db'}"
+        TESTING = True
+
+    # Stand-in summaries: empty files under the names the real ones would have.
+    def fake_summary(total, top5, timestamp):
+        digest = image_generator.summary_digest(total, top5)
+        for fmt in image_generator.IMAGE_FORMATS:
+            open(image_generator.summary_path(digest, fmt), "wb").close()
+        return image_generator.summary_path(digest)
+
+    monkeypatch.setattr(image_generator, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(refresh_service, "generate_summary_image", fake_summary)
+
+    app = create_app(TestConfig())
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def upstream():
+    with StubUpstream(make_countries(120)) as stub:
+        yield stub
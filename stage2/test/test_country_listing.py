@@ -0,0 +1,91 @@
+import pytest
+
+from src.services import country_listing, refresh_service
+
+
+def test_listing_rows_match_the_stored_countries(app, client, upstream):
+    refresh_service.refresh_all()
+
+    body = client.get("/countries?sort=gdp_desc").get_json()
+
+    assert len(body) == 120
+    assert list(body[0]) == list(country_listing.LIST_FIELDS)
+    gdps = [c["estimated_gdp"] for c in body if c["estimated_gdp"] is not None]
+    assert gdps == sorted(gdps, reverse=True)
+    by_name = {c["name"]: c for c in body}
+    source = upstream.countries[7]
+    assert by_name[source["name"]]["capital"] == source["capital"]
+    assert by_name[source["name"]]["population"] == source["population"]
+
+
+def test_filters_apply_to_the_projection(app, client, upstream):
+    refresh_service.refresh_all()
+    expected = {c["name"] for c in upstream.countries if c["region"] == "Asia"}
+
+    body = client.get("/countries?region=Asia").get_json()
+
+    assert {c["name"] for c in body} == expected
+
+
+def test_streamed_listing_matches_buffered(app, client, upstream, monkeypatch):
+    monkeypatch.setattr(country_listing, "STREAM_BATCH_SIZE", 7)
+    refresh_service.refresh_all()
+
+    buffered = client.get("/countries?sort=gdp_asc")
+    streamed = client.get("/countries?sort=gdp_asc&stream=true")
+
+    assert streamed.is_streamed
+    assert streamed.get_data() == buffered.get_data()
+    assert client.get("/countries?region=Nowhere&stream=true").get_json() == []
+
+
+def test_limit_and_offset_page_through_the_sorted_listing(app, client, upstream):
+    refresh_service.refresh_all()
+    full = client.get("/countries?sort=gdp_desc").get_json()
+
+    pages = [client.get(f"/countries?sort=gdp_desc&limit=50&offset={o}").get_json() for o in (0, 50, 100)]
+
+    assert [len(p) for p in pages] == [50, 50, 20]
+    assert [c["id"] for p in pages for c in p] == [c["id"] for c in full]
+
+
+def test_fields_selects_only_the_named_columns(app, client, upstream):
+    refresh_service.refresh_all()
+
+    body = client.get("/countries?fields=name,last_refreshed_at&limit=3").get_json()
+    streamed = client.get("/countries?fields=name,last_refreshed_at&limit=3&stream=true").get_json()
+
+    assert [list(c) for c in body] == [["name", "last_refreshed_at"]] * 3
+    assert streamed == body
+
+
+@pytest.mark.parametrize("query", ["fields=name,secret", "limit=0", "limit=abc", "offset=-1", "limit=5000"])
+def test_bad_listing_params_are_400(client, query):
+    assert client.get(f"/countries?{query}").status_code == 400
+
+
+def test_stats_group_by_region_matches_the_rows(app, client, upstream):
+    refresh_service.refresh_all()
+    rows = client.get("/countries").get_json()
+
+    body = client.get("/countries/stats?group_by=region").get_json()
+
+    assert body["group_by"] == "region"
+    by_region = {g["region"]: g for g in body["groups"]}
+    for region, group in by_region.items():
+        members = [c for c in rows if c["region"] == region]
+        assert group["count"] == len(members)
+        assert group["population_sum"] == sum(c["population"] for c in members)
+        gdps = [c["estimated_gdp"] for c in members if c["estimated_gdp"] is not None]
+        assert group["gdp_sum"] == pytest.approx(sum(gdps))
+        assert group["gdp_avg"] == pytest.approx(sum(gdps) / len(gdps))
+    assert sum(g["count"] for g in body["groups"]) == 120
+
+
+def test_stats_without_group_by_is_one_overall_row(app, client, upstream):
+    refresh_service.refresh_all()
+
+    groups = client.get("/countries/stats").get_json()["groups"]
+
+    assert len(groups) == 1 and groups[0]["count"] == 120
+    assert client.get("/countries/stats?group_by=name").status_code == 400
@@ -0,0 +1,28 @@
+from src.config import Config
+from src.database import TimedQueuePool, db, engine_options
+
+
+def test_pool_options_come_from_config(app):
+    pool = db.engine.pool
+
+    assert isinstance(pool, TimedQueuePool)
+    assert pool.size() == Config.DB_POOL_SIZE
+    assert pool._max_overflow == Config.DB_MAX_OVERFLOW
+    assert pool._recycle == Config.DB_POOL_RECYCLE
+    assert pool._pre_ping == Config.DB_POOL_PRE_PING
+
+
+def test_in_memory_sqlite_keeps_its_own_pool():
+    assert engine_options("sqlite://", 5, 10, 280, True, 10) == {}
+    assert engine_options("sqlite:///:memory:", 5, 10, 280, True, 10) == {}
+
+
+def test_status_reports_pool_metrics(client):
+    client.get("/status")
+
+    pool = client.get("/status").get_json()["db_pool"]
+
+    assert pool["size"] == Config.DB_POOL_SIZE
+    assert pool["checkouts"] >= 1
+    assert pool["peak_in_use"] >= 1 and pool["timeouts"] == 0
+    assert pool["checkout_wait_ms"]["p99"] >= pool["checkout_wait_ms"]["p50"] >= 0
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from benchmarks.stub_upstream import StubUpstream, make_countries
+from src.services import refresh_service
+from src.services.refresh_service import ExternalAPIError, fetch_sources, iter_countries
+
+
+def test_fetch_sources_runs_both_requests_concurrently():
+    with StubUpstream(make_countries(10), latency=0.3) as stub:
+        start = time.perf_counter()
+        countries, rates, _ = fetch_sources(timeout_seconds=5)
+        elapsed = time.perf_counter() - start
+
+    assert list(iter_countries(countries)) == stub.countries
+    assert rates == stub.rates["rates"]
+    assert elapsed < 0.55
+
+
+def test_fetch_sources_reuses_connections():
+    with StubUpstream(make_countries(10)) as stub:
+        for _ in range(3):
+            fetch_sources(timeout_seconds=5)
+
+    assert len(stub.requests) == 6
+    assert len(stub.connections) <= 2
+
+
+def test_fetch_sources_shares_one_deadline():
+    with StubUpstream(make_countries(10), latency=1.0):
+        start = time.perf_counter()
+        with pytest.raises(ExternalAPIError):
+            fetch_sources(timeout_seconds=0.3)
+        assert time.perf_counter() - start < 0.8
+
+
+def test_fetch_sources_names_the_failing_source():
+    with StubUpstream(make_countries(10)) as stub:
+        refresh_service.RATES_API = f"{stub.base_url}/missing"
+        with pytest.raises(ExternalAPIError, match="Exchange Rates API"):
+            fetch_sources(timeout_seconds=5)
+
+
+def test_countries_304_returns_no_body(monkeypatch):
+    monkeypatch.setattr(refresh_service, "SPOOL_MAX_BYTES", 64)
+    with StubUpstream(make_countries(10)):
+        body, _, validators = fetch_sources(timeout_seconds=5)
+        assert body._rolled
+        body.close()
+
+        body, _, again = fetch_sources(timeout_seconds=5, validators=validators)
+
+    assert body is None
+    assert again["countries"]["hash"] == validators["countries"]["hash"]
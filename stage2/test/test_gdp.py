@@ -0,0 +1,101 @@
+import pytest
+
+from benchmarks.stub_upstream import StubUpstream, make_countries
+from src.database import db
+from src.models import Country, RateHistory
+from src.services import refresh_jobs, refresh_service
+from src.services.refresh_service import gdp_multiplier
+
+
+def gdp_by_name():
+    return {c.name: c.estimated_gdp for c in Country.query.all()}
+
+
+def test_seeded_multiplier_is_fixed_per_country():
+    multipliers = [gdp_multiplier(f"country {i}", "seed") for i in range(500)]
+
+    assert multipliers == [gdp_multiplier(f"country {i}", "seed") for i in range(500)]
+    assert all(1000 <= m <= 2000 for m in multipliers)
+    assert len(set(multipliers)) > 100
+    assert multipliers != [gdp_multiplier(f"country {i}", "other") for i in range(500)]
+
+
+def test_seeded_refresh_reproduces_gdp_after_delete(app, client, upstream):
+    refresh_service.refresh_all()
+    before = gdp_by_name()
+    name = upstream.countries[1]["name"]
+
+    client.delete(f"/countries/{name}")
+    refresh_service.refresh_all()
+
+    assert gdp_by_name() == before
+
+
+def test_recompute_uses_new_rates_without_fetching_countries(app, client, upstream):
+    refresh_service.refresh_all()
+    code = next(c.currency_code for c in Country.query.all() if c.exchange_rate is not None)
+    upstream.rates["rates"][code] /= 4
+    before = gdp_by_name()
+    upstream.requests.clear()
+
+    body = client.post("/countries/recompute").get_json()
+
+    assert [path for path, _ in upstream.requests] == ["/rates"]
+    rerated = Country.query.filter_by(currency_code=code).all()
+    assert body["changed_countries"] == len(rerated)
+    for c in rerated:
+        assert c.estimated_gdp == pytest.approx(before[c.name] * 4)
+
+
+def test_recompute_applies_a_new_seed(app, client, upstream):
+    refresh_service.refresh_all()
+    before = gdp_by_name()
+    app.config["GDP_MULTIPLIER_SEED"] = "another seed"
+
+    client.post("/countries/recompute")
+
+    after = gdp_by_name()
+    rated = [name for name, gdp in before.items() if gdp]
+    assert sum(after[name] != before[name] for name in rated) > len(rated) // 2
+    assert {n for n, g in before.items() if not g} == {n for n, g in after.items() if not g}
+
+
+def test_recompute_reports_unavailable_rates(client, upstream, monkeypatch):
+    monkeypatch.setattr(refresh_service, "RATES_API", f"{upstream.base_url}/missing")
+
+    assert client.post("/countries/recompute").status_code == 503
+
+
+def test_recompute_waits_for_a_running_refresh(app, client):
+    with StubUpstream(make_countries(20), latency=0.3) as upstream:
+        refresh = client.post("/countries/refresh").get_json()
+        upstream.rates["rates"]["C01"] = 1.5
+
+        body = client.post("/countries/recompute").get_json()
+
+    refresh_job = refresh_jobs.get_job(refresh["job_id"])
+    recompute_job = refresh_jobs.get_job(body["job_id"])
+    assert refresh_job.status == recompute_job.status == "succeeded"
+    assert recompute_job.started_at >= refresh_job.finished_at
+    rows = RateHistory.query.filter_by(currency_code="C01").all()
+    assert len({row.fetched_at for row in rows}) == len(rows)
+
+
+def test_failed_recompute_saves_nothing(app, client, upstream, monkeypatch):
+    refresh_service.refresh_all()
+    before = gdp_by_name()
+    generation = refresh_service.current_generation(db.session)
+    for code in upstream.rates["rates"]:
+        upstream.rates["rates"][code] *= 2
+
+    def broken_render(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(refresh_service, "generate_summary_image", broken_render)
+    response = client.post("/countries/recompute")
+
+    assert response.status_code == 500
+    assert response.get_json()["error"] == "Internal server error: disk full"
+    db.session.expire_all()
+    assert gdp_by_name() == before
+    assert refresh_service.current_generation(db.session) == generation
@@ -0,0 +1,88 @@
+import marshal
+
+import pytest
+
+from src.services import refresh_jobs, refresh_service
+from src.utils.metrics import CONTENT_TYPE, Registry
+
+
+def sample(text, line_start):
+    values = [line.rsplit(" ", 1)[1] for line in text.splitlines() if line.startswith(line_start)]
+    return float(values[0]) if values else 0.0
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1))
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    latency.observe(5, route="/a")
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_metric_rejects_wrong_labels_and_kinds():
+    registry = Registry()
+    runs = registry.counter("runs_total", "Runs.", ["outcome"])
+
+    with pytest.raises(ValueError):
+        runs.inc(kind="refresh")
+    with pytest.raises(ValueError):
+        registry.gauge("runs_total", "Runs.")
+    assert registry.counter("runs_total", "Runs.", ["outcome"]) is runs
+
+
+def test_refresh_publishes_phases_rows_and_bytes(app, client, upstream):
+    before = client.get("/metrics").get_data(as_text=True)
+
+    refresh_service.refresh_all()
+    response = client.get("/metrics")
+    after = response.get_data(as_text=True)
+
+    assert response.headers["Content-Type"] == CONTENT_TYPE
+    for phase in ("fetch", "parse", "upsert", "commit", "render"):
+        key = f'refresh_phase_seconds_count{{phase="{phase}"}}'
+        assert sample(after, key) == sample(before, key) + 1
+
+    key = 'refresh_rows_total{result="inserted"}'
+    assert sample(after, key) == sample(before, key) + 120
+    key = 'refresh_downloaded_bytes_total{source="countries"}'
+    assert sample(after, key) > sample(before, key)
+    key = 'refresh_runs_total{kind="refresh",outcome="succeeded"}'
+    assert sample(after, key) == sample(before, key) + 1
+
+
+def test_requests_are_timed_by_route_pattern(client):
+    client.get("/countries/Nowhere")
+
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/countries/<name>",status="404"}' in text
+    assert 'db_pool_connections{state="in_use"}' in text
+
+
+def test_profiled_refresh_keeps_its_stats(client, upstream):
+    job_id = client.post("/countries/refresh?profile=true").get_json()["job_id"]
+    assert refresh_jobs.wait_for(job_id, timeout=10)
+
+    status = client.get(f"/countries/refresh/{job_id}").get_json()
+    assert status["status"] == "succeeded"
+    assert "refresh_all" in status["profile"]
+
+    response = client.get(f"/countries/refresh/{job_id}/profile")
+    assert response.status_code == 200
+    assert any(func[2] == "refresh_all" for func in marshal.loads(response.data))
+
+
+def test_unprofiled_job_has_no_profile(client, upstream):
+    job_id = client.post("/countries/refresh").get_json()["job_id"]
+    assert refresh_jobs.wait_for(job_id, timeout=10)
+
+    assert client.get(f"/countries/refresh/{job_id}").get_json()["profile"] is None
+    assert client.get(f"/countries/refresh/{job_id}/profile").status_code == 404
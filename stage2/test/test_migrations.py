@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from src.database import db
+from src.migrations import MigrationError, upgrade
+from src.models import Country
+
+
+def legacy_engine(tmp_path, names=("Straße", "Chad", "Côte d'Ivoire")):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE countries (id INTEGER PRIMARY KEY, name VARCHAR(128) NOT NULL, "
+            "capital VARCHAR(128), region VARCHAR(64), population BIGINT, "
+            "currency_code VARCHAR(8), exchange_rate FLOAT, estimated_gdp FLOAT, "
+            "flag_url VARCHAR(255), last_refreshed_at DATETIME)"
+        ))
+        conn.execute(text("INSERT INTO countries (id, name) VALUES (:id, :name)"),
+                     [{"id": i, "name": name} for i, name in enumerate(names, start=1)])
+    return engine
+
+
+def test_upgrade_backfills_casefolded_names_and_adds_indexes(tmp_path):
+    engine = legacy_engine(tmp_path)
+
+    applied = upgrade(engine)
+
+    assert applied[0] == "added countries.name_normalized"
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, name_normalized FROM countries ORDER BY id")).all()
+    assert rows == [(1, "strasse"), (2, "chad"), (3, "côte d'ivoire")]
+    indexes = {i["name"] for i in inspect(engine).get_indexes("countries")}
+    assert {i.name for i in Country.__table__.indexes} <= indexes
+    assert upgrade(engine) == []
+
+
+def test_upgrade_refuses_names_that_collide_when_casefolded(tmp_path):
+    engine = legacy_engine(tmp_path, names=("Straße", "Chad", "STRASSE", "chad "))
+
+    with pytest.raises(MigrationError) as error:
+        upgrade(engine)
+
+    assert "1 'Straße', 3 'STRASSE'" in str(error.value)
+    assert "2 'Chad', 4 'chad '" in str(error.value)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM countries")).scalar() == 4
+    assert "name_normalized" not in {c["name"] for c in inspect(engine).get_columns("countries")}
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM countries WHERE id IN (3, 4)"))
+    assert upgrade(engine)[0] == "added countries.name_normalized"
+
+
+def test_name_lookups_use_the_normalized_column(app, client):
+    db.session.add(Country(name="Côte d'Ivoire", population=1))
+    db.session.commit()
+
+    assert client.get("/countries/CÔTE D'IVOIRE").get_json()["name"] == "Côte d'Ivoire"
+    assert client.delete("/countries/côte d'ivoire").status_code == 200
+    assert Country.query.count() == 0
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import column, select, text
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.schema import CreateTable
+
+from src import migrations
+from src.database import db
+from src.models import RateHistory
+from src.services import refresh_service
+from src.services.rate_history import _bucket_label, record_rates
+
+
+@pytest.fixture
+def history(app):
+    start = datetime(2025, 1, 1)
+    for hour in range(72):
+        record_rates(db.session, {"NGN": 1500.0 + hour, "USD": 1.0}, start + timedelta(hours=hour))
+    db.session.commit()
+    return start
+
+
+def test_refresh_appends_rates_only_when_they_change(app, upstream):
+    refresh_service.refresh_all()
+    first = RateHistory.query.count()
+    assert first == len(upstream.rates["rates"])
+
+    refresh_service.refresh_all()
+    assert RateHistory.query.count() == first
+
+    upstream.rates["rates"]["C00"] += 1
+    refresh_service.refresh_all()
+    assert RateHistory.query.count() == 2 * first
+
+
+def test_raw_history_is_filtered_by_range(client, history):
+    body = client.get("/currencies/ngn/history?from=2025-01-02&to=2025-01-02T05:00").get_json()
+
+    assert body["currency_code"] == "NGN"
+    assert [p["rate"] for p in body["points"]] == [1524.0 + h for h in range(6)]
+    assert body["points"][0]["fetched_at"] == "2025-01-02T00:00:00"
+
+
+def test_history_is_bucketed_in_sql(client, history):
+    points = client.get("/currencies/NGN/history?bucket=day").get_json()["points"]
+
+    assert [p["bucket"] for p in points] == ["2025-01-01", "2025-01-02", "2025-01-03"]
+    assert points[1] == {"bucket": "2025-01-02", "count": 24, "avg": 1535.5, "min": 1524.0, "max": 1547.0}
+
+
+def test_weeks_are_labelled_by_their_monday(client):
+    # Sat 2026-10-17 and Mon 2026-10-19; Mon 2026-12-28 to Sun 2027-01-03
+    # is one week across the year boundary.
+    days = [datetime(2026, 10, 17, 23), datetime(2026, 10, 19), datetime(2026, 12, 28),
+            datetime(2027, 1, 1, 12), datetime(2027, 1, 3, 23, 59)]
+    for rate, day in enumerate(days, start=1):
+        record_rates(db.session, {"NGN": float(rate)}, day)
+    db.session.commit()
+
+    points = client.get("/currencies/NGN/history?bucket=week").get_json()["points"]
+
+    assert [(p["bucket"], p["count"]) for p in points] == [
+        ("2026-10-12", 1), ("2026-10-19", 1), ("2026-12-28", 3),
+    ]
+
+
+@pytest.mark.parametrize("dialect, expected", [
+    (mysql.dialect(), "date_format(subdate(fetched_at, weekday(fetched_at)), '%Y-%m-%d')"),
+    (postgresql.dialect(), "to_char(date_trunc('week', fetched_at), 'YYYY-MM-DD')"),
+])
+def test_week_label_sql_per_dialect(dialect, expected):
+    stmt = select(_bucket_label(column("fetched_at"), "week", dialect.name))
+
+    sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+    assert expected in sql.replace("%%", "%")
+
+
+def test_history_range_scan_uses_the_covering_index(app, history):
+    plan = db.session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT fetched_at, rate FROM rate_history "
+        "WHERE currency_code = 'NGN' AND fetched_at >= '2025-01-02' ORDER BY fetched_at"
+    )).all()
+
+    assert "COVERING INDEX ix_rate_history_code_time_rate" in " ".join(row[-1] for row in plan)
+
+
+@pytest.mark.parametrize("query", ["bucket=year", "from=yesterday", "to=2025-13-01"])
+def test_bad_history_params_are_400(client, query):
+    assert client.get(f"/currencies/NGN/history?{query}").status_code == 400
+
+
+def test_fetched_at_keeps_microseconds_on_mysql():
+    ddl = str(CreateTable(RateHistory.__table__).compile(dialect=mysql.dialect()))
+
+    assert "fetched_at DATETIME(6) NOT NULL" in ddl
+
+
+@pytest.mark.parametrize("column_type, altered", [(mysql.DATETIME(), True), (mysql.DATETIME(fsp=6), False)])
+def test_upgrade_widens_whole_second_fetched_at(monkeypatch, column_type, altered):
+    class Inspector:
+        def get_columns(self, table):
+            return [{"name": "currency_code", "type": mysql.VARCHAR(8)}, {"name": "fetched_at", "type": column_type}]
+
+    class Connection:
+        statements = []
+
+        def execute(self, statement):
+            self.statements.append(str(statement))
+
+    monkeypatch.setattr(migrations, "inspect", lambda conn: Inspector())
+    conn = Connection()
+
+    assert migrations._widen_fetched_at(conn) is altered
+    assert conn.statements == (["ALTER TABLE rate_history MODIFY fetched_at DATETIME(6) NOT NULL"] if altered else [])
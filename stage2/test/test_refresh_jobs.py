@@ -0,0 +1,160 @@
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete
+
+from benchmarks.stub_upstream import StubUpstream, make_countries
+from src.app import create_app
+from src.config import Config
+from src.database import db
+from src.models import Meta, RefreshJob
+from src.services import refresh_jobs, refresh_service
+
+
+def wait_for(client, job_id):
+    assert refresh_jobs.wait_for(job_id, timeout=10)
+    return client.get(f"/countries/refresh/{job_id}").get_json()
+
+
+def test_refresh_returns_202_and_reports_phases(client, upstream):
+    response = client.post("/countries/refresh")
+
+    assert response.status_code == 202
+    body = response.get_json()
+    assert response.headers["Location"] == body["status_url"]
+
+    status = wait_for(client, body["job_id"])
+    assert status["status"] == "succeeded"
+    assert status["result"]["total_countries"] == 120
+    assert status["result"]["changed_countries"] == 120
+    assert set(status["phases"]) == {"fetch", "parse", "upsert", "commit", "render"}
+
+
+def test_concurrent_refreshes_join_the_running_job(client):
+    with StubUpstream(make_countries(20), latency=0.3):
+        first = client.post("/countries/refresh").get_json()
+        second = client.post("/countries/refresh").get_json()
+
+        assert second["job_id"] == first["job_id"]
+        wait_for(client, first["job_id"])
+
+        third = client.post("/countries/refresh").get_json()
+        assert third["job_id"] != first["job_id"]
+        wait_for(client, third["job_id"])
+
+
+def test_failed_refresh_is_reported_on_the_job(client, upstream, monkeypatch):
+    monkeypatch.setattr(refresh_jobs.refresh_service, "RATES_API", f"{upstream.base_url}/missing")
+
+    job_id = client.post("/countries/refresh").get_json()["job_id"]
+    status = wait_for(client, job_id)
+
+    assert status["status"] == "failed"
+    assert status["error"]["error"] == "External data source unavailable"
+
+
+@pytest.mark.parametrize("job_id", ["nope", "0" * 32])
+def test_unknown_job_is_404(client, job_id):
+    assert client.get(f"/countries/refresh/{job_id}").status_code == 404
+
+
+def test_status_polls_during_a_run_never_fail(client, monkeypatch):
+    release = threading.Event()
+
+    def slow_task(timeout_seconds, timings):
+        # Keep adding phases while the job is polled.
+        i = 0
+        while not release.is_set():
+            timings[f"phase {i}"] = float(i)
+            i += 1
+        return {"total": 0, "changed": 0, "skipped": 0, "rows": {}, "last_refreshed_at": None}
+
+    monkeypatch.setitem(refresh_jobs.TASKS, "refresh", slow_task)
+    # Switch threads often so polls interleave with the writes.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        job_id = client.post("/countries/refresh").get_json()["job_id"]
+        statuses = [client.get(f"/countries/refresh/{job_id}").status_code for _ in range(300)]
+    finally:
+        release.set()
+        sys.setswitchinterval(interval)
+    status = wait_for(client, job_id)
+
+    assert set(statuses) == {200}
+    assert status["status"] == "succeeded"
+    assert status["phases"]
+
+
+def other_worker(app):
+    """A second app on the same database, as another gunicorn worker would be."""
+    class WorkerConfig(Config):
+        SQLALCHEMY_DATABASE_URI = app.config["SQLALCHEMY_DATABASE_URI"]
+
+    return create_app(WorkerConfig()).test_client()
+
+
+def test_any_worker_reports_a_job(app, client, upstream):
+    job_id = client.post("/countries/refresh?profile=true").get_json()["job_id"]
+    wait_for(client, job_id)
+
+    other = other_worker(app)
+    status = other.get(f"/countries/refresh/{job_id}").get_json()
+    assert status["status"] == "succeeded"
+    assert status["result"]["total_countries"] == 120
+    assert other.get(f"/countries/refresh/{job_id}/profile").status_code == 200
+
+
+def test_refresh_joins_a_job_queued_by_another_worker(app, client):
+    db.session.add(RefreshJob(id="a" * 32, kind="refresh", status="queued", submitted_at=datetime.now()))
+    db.session.commit()
+
+    assert client.post("/countries/refresh").get_json()["job_id"] == "a" * 32
+
+
+def test_job_waits_while_another_worker_holds_the_lock(app, client, upstream):
+    db.session.add(Meta(key=refresh_jobs.LOCK_KEY, value=f"{'b' * 32} {time.time()}"))
+    db.session.commit()
+
+    job_id = client.post("/countries/refresh").get_json()["job_id"]
+    time.sleep(0.5)
+    assert client.get(f"/countries/refresh/{job_id}").get_json()["status"] == "queued"
+
+    db.session.execute(delete(Meta).where(Meta.key == refresh_jobs.LOCK_KEY))
+    db.session.commit()
+    assert wait_for(client, job_id)["status"] == "succeeded"
+    assert refresh_service.get_meta(db.session, refresh_jobs.LOCK_KEY) is None
+
+
+def test_lock_of_a_dead_worker_is_taken_over(app, client, upstream):
+    abandoned = "c" * 32
+    expired = time.time() - refresh_jobs.JOB_LEASE_SECONDS - 1
+    db.session.add(RefreshJob(id=abandoned, kind="refresh", status="running",
+                              submitted_at=datetime.now() - timedelta(hours=1)))
+    db.session.add(Meta(key=refresh_jobs.LOCK_KEY, value=f"{abandoned} {expired}"))
+    db.session.commit()
+
+    job_id = client.post("/countries/refresh").get_json()["job_id"]
+
+    assert job_id != abandoned
+    assert wait_for(client, job_id)["status"] == "succeeded"
+    status = client.get(f"/countries/refresh/{abandoned}").get_json()
+    assert status["status"] == "failed"
+    assert status["error"]["error"].startswith("Abandoned")
+
+
+def test_only_the_newest_finished_jobs_are_kept(app, client, monkeypatch):
+    monkeypatch.setattr(refresh_jobs, "MAX_JOBS", 3)
+    start = datetime.now() - timedelta(hours=1)
+    for i in range(5):
+        db.session.add(RefreshJob(id=f"{i:032d}", kind="refresh", status="succeeded",
+                                  submitted_at=start + timedelta(minutes=i)))
+    db.session.commit()
+
+    job_id = client.post("/countries/refresh").get_json()["job_id"]
+
+    kept = {job.id for job in RefreshJob.query.all()}
+    assert kept == {f"{3:032d}", f"{4:032d}", job_id}
@@ -0,0 +1,161 @@
+import pytest
+
+from src.database import db
+from src.models import Country, Meta
+from src.services import refresh_service
+
+
+def test_refresh_inserts_then_updates_in_place(app, upstream):
+    result = refresh_service.refresh_all()
+    assert result["total"] == 120
+    ids = {c.name: c.id for c in Country.query.all()}
+
+    upstream.countries[0]["population"] = 42
+    upstream.countries.append({"name": "Newland", "population": 5, "currencies": []})
+    result = refresh_service.refresh_all()
+
+    assert result["total"] == 121
+    rows = {c.name: c for c in Country.query.all()}
+    assert {name: rows[name].id for name in ids} == ids
+    assert rows[upstream.countries[0]["name"]].population == 42
+    assert rows["Newland"].estimated_gdp == 0
+    assert db.session.get(Meta, "last_refreshed_at").value == result["last_refreshed_at"]
+
+
+def test_refresh_matches_names_case_insensitively(app, upstream):
+    refresh_service.refresh_all()
+    upstream.countries[1]["name"] = upstream.countries[1]["name"].upper()
+
+    refresh_service.refresh_all()
+
+    assert Country.query.count() == 120
+
+
+def test_refresh_sets_rate_fields(app, upstream):
+    refresh_service.refresh_all()
+    rates = upstream.rates["rates"]
+
+    for c in Country.query.all():
+        if c.currency_code is None:
+            assert c.estimated_gdp == 0
+        elif c.currency_code in rates:
+            assert c.exchange_rate == rates[c.currency_code]
+            assert c.estimated_gdp > 0
+        else:
+            assert c.exchange_rate is None and c.estimated_gdp is None
+
+
+def test_unchanged_refresh_is_conditional_and_skips_writes(app, upstream, monkeypatch):
+    refresh_service.refresh_all()
+    images = []
+    monkeypatch.setattr(refresh_service, "generate_summary_image",
+                        lambda *args: images.append(args))
+    gdp = {c.name: c.estimated_gdp for c in Country.query.all()}
+
+    result = refresh_service.refresh_all()
+
+    assert result["changed"] == 0
+    assert result["total"] == 120
+    assert images == []
+    assert all("If-None-Match" in headers for _, headers in upstream.requests[-2:])
+    assert {c.name: c.estimated_gdp for c in Country.query.all()} == gdp
+
+
+def test_unchanged_body_without_etag_is_detected_by_hash(app, upstream):
+    upstream.conditional = False
+    refresh_service.refresh_all()
+
+    assert refresh_service.refresh_all()["changed"] == 0
+
+
+def test_refresh_updates_only_rows_that_differ(app, upstream):
+    refresh_service.refresh_all()
+    before = {c.name: (c.estimated_gdp, c.last_refreshed_at) for c in Country.query.all()}
+    target = upstream.countries[3]["name"]
+    upstream.countries[3]["capital"] = "Elsewhere"
+
+    result = refresh_service.refresh_all()
+
+    assert result["changed"] == 1
+    after = {c.name: (c.estimated_gdp, c.last_refreshed_at) for c in Country.query.all()}
+    assert after[target][1] != before[target][1]
+    assert {k: v for k, v in after.items() if k != target} == \
+        {k: v for k, v in before.items() if k != target}
+
+
+def test_delete_forces_next_refresh_to_restore_rows(app, client, upstream):
+    refresh_service.refresh_all()
+    name = upstream.countries[0]["name"]
+    client.delete(f"/countries/{name}")
+
+    result = refresh_service.refresh_all()
+
+    assert result["changed"] == 1
+    assert result["total"] == 120
+
+
+def test_invalid_and_repeated_countries_are_skipped(app, upstream):
+    upstream.countries[5]["population"] = None
+    del upstream.countries[6]["name"]
+    upstream.countries.append("not a country")
+    upstream.countries.append(dict(upstream.countries[0], capital="Second"))
+
+    result = refresh_service.refresh_all()
+
+    assert result["skipped"] == 4
+    assert result["total"] == 118
+    assert Country.query.filter_by(name=upstream.countries[0]["name"]).one().capital == upstream.countries[0]["capital"]
+
+
+def test_rates_only_change_rerates_without_reading_countries(app, upstream, monkeypatch):
+    refresh_service.refresh_all()
+    code = next(c.currency_code for c in Country.query.all() if c.exchange_rate is not None)
+    upstream.rates["rates"][code] *= 2
+    monkeypatch.setattr(refresh_service, "iter_countries", None)
+
+    result = refresh_service.refresh_all()
+
+    assert result["changed"] == Country.query.filter_by(currency_code=code).count()
+    for c in Country.query.filter_by(currency_code=code):
+        assert c.exchange_rate == upstream.rates["rates"][code]
+
+
+def test_refresh_streams_countries_in_small_batches(app, upstream, monkeypatch):
+    monkeypatch.setattr(refresh_service, "WRITE_BATCH_SIZE", 7)
+    monkeypatch.setattr(refresh_service, "CHUNK_SIZE", 100)
+
+    assert refresh_service.refresh_all()["changed"] == 120
+    assert Country.query.count() == 120
+
+
+def test_malformed_countries_body_is_an_external_error(app, upstream):
+    upstream.countries = {"not": "a list"}
+
+    with pytest.raises(refresh_service.ExternalAPIError, match="parse"):
+        refresh_service.refresh_all()
+    assert Country.query.count() == 0
+
+
+def test_failed_render_leaves_rows_and_cached_responses_consistent(app, client, upstream, monkeypatch):
+    refresh_service.refresh_all()
+    name = upstream.countries[0]["name"]
+    generation = refresh_service.current_generation(db.session)
+    assert client.get(f"/countries/{name}").get_json()["capital"] != "Changed"
+
+    def broken_render(*args):
+        raise OSError("disk full")
+
+    render = refresh_service.generate_summary_image
+    monkeypatch.setattr(refresh_service, "generate_summary_image", broken_render)
+    upstream.countries[0]["capital"] = "Changed"
+    with pytest.raises(OSError):
+        refresh_service.refresh_all()
+
+    # Nothing from the failed run is saved, so the next one redoes it all.
+    db.session.expire_all()
+    assert Country.query.filter_by(name=name).one().capital != "Changed"
+    assert refresh_service.current_generation(db.session) == generation
+
+    monkeypatch.setattr(refresh_service, "generate_summary_image", render)
+    assert refresh_service.refresh_all()["changed"] == 1
+    assert client.get(f"/countries/{name}").get_json()["capital"] == "Changed"
@@ -0,0 +1,94 @@
+from src import app as app_module
+from src.app import create_app
+from src.config import Config
+from src.services import refresh_service
+from src.utils.response_cache import ResponseCache
+
+
+def test_listing_is_cached_and_revalidated_with_etag(app, client, upstream, monkeypatch):
+    refresh_service.refresh_all()
+    first = client.get("/countries?region=Africa")
+    etag = first.headers["ETag"]
+
+    monkeypatch.setattr(app_module, "listing_json", None)
+    second = client.get("/countries?region=Africa")
+    assert second.get_data() == first.get_data()
+
+    not_modified = client.get("/countries?region=Africa", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b""
+
+
+def test_refresh_with_changes_invalidates_cached_responses(app, client, upstream):
+    refresh_service.refresh_all()
+    name = upstream.countries[0]["name"]
+    before = client.get(f"/countries/{name}")
+
+    upstream.countries[0]["capital"] = "Elsewhere"
+    refresh_service.refresh_all()
+
+    after = client.get(f"/countries/{name}", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.get_json()["capital"] == "Elsewhere"
+
+
+def test_unchanged_refresh_keeps_cached_responses(app, client, upstream):
+    refresh_service.refresh_all()
+    etag = client.get("/countries").headers["ETag"]
+
+    refresh_service.refresh_all()
+
+    assert client.get("/countries", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_delete_invalidates_cached_responses(app, client, upstream):
+    refresh_service.refresh_all()
+    name = upstream.countries[0]["name"]
+    assert len(client.get("/countries").get_json()) == 120
+    assert client.get(f"/countries/{name}").status_code == 200
+
+    client.delete(f"/countries/{name}")
+
+    assert len(client.get("/countries").get_json()) == 119
+    assert client.get(f"/countries/{name}").status_code == 404
+
+
+def test_write_in_another_worker_invalidates_this_one(app, client, upstream):
+    class OtherWorker(Config):
+        SQLALCHEMY_DATABASE_URI = app.config["SQLALCHEMY_DATABASE_URI"]
+
+    refresh_service.refresh_all()
+    name = upstream.countries[0]["name"]
+    assert client.get(f"/countries/{name}").status_code == 200
+
+    other = create_app(OtherWorker())
+    assert other.test_client().delete(f"/countries/{name}").status_code == 200
+
+    assert client.get(f"/countries/{name}").status_code == 404
+
+
+def test_new_generation_empties_the_cache():
+    cache = ResponseCache(max_bytes=100)
+    assert cache.get("a", "g1") is None
+    cache.put("a", "g1", b"{}")
+    assert cache.get("a", "g1").body == b"{}"
+
+    assert cache.get("a", "g2") is None
+    # A body built under the old stamp is not cached under the new one.
+    cache.put("a", "g1", b"{}")
+    assert cache.get("a", "g2") is None
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ResponseCache(max_bytes=40)
+    cache.get("a", "g1")
+    for key in "abc":
+        cache.put(key, "g1", b"x" * 10)
+    cache.get("a", "g1")
+    cache.put("d", "g1", b"x" * 10)
+    cache.put("e", "g1", b"x" * 10)
+
+    assert cache.get("b", "g1") is None
+    assert cache.get("a", "g1") is not None
+    assert cache.put("big", "g1", b"x" * 11).etag
+    assert cache.get("big", "g1") is None
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+from src.database import db
+from src.models import Meta
+from src.services import refresh_service
+from src.utils import image_generator
+
+TOP5 = [{"name": f"Country {i}", "estimated_gdp": 1000.0 * i} for i in range(5, 0, -1)]
+
+
+@pytest.fixture
+def image_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_generator, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_unchanged_summary_is_not_rendered_again(image_dir, monkeypatch):
+    first = image_generator.generate_summary_image(5, TOP5, datetime.now())
+    renders = []
+    monkeypatch.setattr(image_generator, "_render", lambda *args: renders.append(args))
+
+    assert image_generator.generate_summary_image(5, TOP5, datetime.now()) == first
+    assert renders == []
+    assert sorted(p.name.rsplit(".", 1)[1] for p in image_dir.iterdir()) == ["png", "webp"]
+
+
+def test_old_summaries_are_pruned(image_dir, monkeypatch):
+    monkeypatch.setattr(image_generator, "KEEP_IMAGES", 1)
+    for total in range(4):
+        image_generator.generate_summary_image(total, TOP5, datetime.now())
+
+    assert len(list(image_dir.iterdir())) == 4
+
+
+def test_image_endpoint_serves_current_summary_with_etag(app, client, upstream, image_dir, monkeypatch):
+    monkeypatch.setattr(refresh_service, "generate_summary_image", image_generator.generate_summary_image)
+    refresh_service.refresh_all()
+
+    response = client.get("/countries/image")
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.get_data().startswith(b"\x89PNG")
+    assert client.get("/countries/image", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    webp = client.get("/countries/image", headers={"Accept": "image/webp,*/*"})
+    assert webp.mimetype == "image/webp"
+    assert client.get("/countries/image?format=gif").status_code == 400
+
+    addressed = client.get(response.headers["Content-Location"])
+    assert addressed.get_data() == response.get_data()
+    assert addressed.cache_control.immutable
+    assert addressed.cache_control.max_age == 365 * 24 * 3600
+
+
+def test_image_endpoint_404s_before_first_refresh(client):
+    assert client.get("/countries/image").status_code == 404
+    assert client.get("/countries/image/abc.png").status_code == 404
+
+
+@pytest.mark.parametrize("lose", ["files", "meta"])
+def test_unchanged_refresh_restores_a_missing_summary(app, client, upstream, image_dir, monkeypatch, lose):
+    monkeypatch.setattr(refresh_service, "generate_summary_image", image_generator.generate_summary_image)
+    refresh_service.refresh_all()
+    assert client.get("/countries/image").status_code == 200
+
+    if lose == "files":
+        # make clear-cache, or a fresh container on the same database
+        for path in image_dir.iterdir():
+            path.unlink()
+    else:
+        # a database from before summaries were content-addressed
+        db.session.delete(db.session.get(Meta, "summary_image"))
+        db.session.commit()
+    image_generator._read.cache_clear()
+
+    result = refresh_service.refresh_all()
+
+    assert result["changed"] == 0
+    assert result["image_path"]
+    assert client.get("/countries/image").status_code == 200
+    assert client.get("/countries/image?format=webp").status_code == 200